@@ -1,287 +1,492 @@
+import argparse
+import multiprocessing
+import threading
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_gtk3agg import FigureCanvasGTK3Agg as FigureCanvas
-import gi
-gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk
-from database import Database
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from database import get_database
+from figure_cache import get_figure_cache
+from feedback_index import to_epoch_seconds
+from feedback_table import FeedbackTable
+from plots import PLOT_RENDERERS, REPORT_DPI, render_plot, save_plot
+from rating_aggregates import MAX_RATING, MIN_RATING
+from summary import PERCENTILES, component_summary, rating_histograms, summarize_histograms
 import os
 from datetime import datetime, timedelta
 
+# GTK is only imported by show_analysis, so reports can be generated
+# headless (see the command line entry point at the end of this file).
+# Figures are built with matplotlib.figure.Figure rather than pyplot so no
+# GUI backend is needed to render them.
+
+# How many of the most-rated items the heatmap shows on menus with many dishes
+HEATMAP_TOP_ITEMS = 40
+
+# Time series periods and their pandas resample rules
+TREND_FREQUENCIES = {"day": "D", "week": "W", "month": "MS"}
+# Time series limits: most-rated components drawn and most points per line
+# (about one per pixel of the 12 inch, 100 DPI figure)
+TREND_TOP_COMPONENTS = 8
+TREND_MAX_POINTS = 1200
+
+def item_labels(item_ids, item_names):
+    """Name of each item ID, or "Item <id>" for items not in ``item_names``"""
+    item_ids = pd.Series(np.asarray(item_ids))
+    return item_ids.map(item_names).fillna('Item ' + item_ids.astype(str))
+
+def build_feedback_frame_from_columns(columns, item_names):
+    """Build a DataFrame with one row per feedback entry and one rating_<id> column per component.
+
+    ``columns`` is the dict returned by Database.get_rating_columns or
+    FeedbackTable.rating_columns (one row per component rating, grouped by
+    feedback_id) and ``item_names`` maps item IDs to names. Ratings go into
+    a float32 matrix, NaN where a component was not rated.
+    """
+    feedback_ids = columns["feedback_id"]
+    if len(feedback_ids) == 0:
+        return pd.DataFrame()
+        
+    # Ratings of one feedback entry are stored next to each other, so each
+    # change of feedback_id starts a new DataFrame row
+    starts = np.flatnonzero(np.r_[True, feedback_ids[1:] != feedback_ids[:-1]])
+    row_index = np.cumsum(np.r_[True, feedback_ids[1:] != feedback_ids[:-1]]) - 1
+    comp_ids, col_index = np.unique(columns["component_id"], return_inverse=True)
+    
+    matrix = np.full((len(starts), len(comp_ids)), np.nan, dtype=np.float32)
+    matrix[row_index, col_index] = columns["rating"]
+    
+    item_ids = np.asarray(columns["item_id"][starts])
+    df = pd.DataFrame({
+        'item_id': item_ids,
+        'item_name': item_labels(item_ids, item_names),
+        'timestamp': pd.to_datetime(np.asarray(columns["timestamp"][starts]), unit='s'),
+    })
+    
+    ratings_df = pd.DataFrame(matrix, columns=[f'rating_{comp_id}' for comp_id in comp_ids])
+    return pd.concat([df, ratings_df], axis=1)
+
+def summary_table(names, stats):
+    """Component summary DataFrame from summary.summarize_histograms output"""
+    table = pd.DataFrame({
+        'Component': names,
+        'Count': stats["count"],
+        'Mean': stats["mean"],
+        'Median': stats["median"],
+        'Std Dev': stats["std"],
+        'Min': stats["min"],
+        'Max': stats["max"]
+    })
+    for q in PERCENTILES:
+        table[f'P{q}'] = stats[f"p{q}"]
+    table['CI Low'] = stats["ci_low"]
+    table['CI High'] = stats["ci_high"]
+    
+    # Skip components without ratings
+    if not table['Count'].any():
+        return pd.DataFrame()
+    return table[table['Count'] > 0].reset_index(drop=True)
+
+def summarize_rating_frame(df, rating_cols, comp_mapping):
+    """Component summary of the rating_<id> columns of a feedback DataFrame"""
+    names = [comp_mapping.get(col, col) for col in rating_cols]
+    return summary_table(names, summarize_histograms(rating_histograms(df[rating_cols].to_numpy())))
+
+class AnalyticsSession:
+    """Feedback data loaded once, with memoized results derived from it.
+
+    A session is a snapshot: create a new one to pick up feedback that
+    arrived after it was loaded.
+    """
+    def __init__(self, analytics, since=None, until=None):
+        self.analytics = analytics
+        self.db = analytics.db
+        # Optional date range [since, until) the feedback is limited to
+        self.since = since
+        self.until = until
+        # Identifies the data the session sees, for caching rendered plots
+        self.data_version = self.db.get_data_version()
+        self._memo = {}
+        # Plots are rendered on a worker thread while the dialog can use the
+        # session too (e.g. to export a report)
+        self._lock = threading.RLock()
+        
+    def _memoize(self, key, compute):
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = compute()
+            return self._memo[key]
+    
+    @property
+    def rating_data(self):
+        """Long-format rating columns and item names (see load_rating_columns)"""
+        return self._memoize("rating_data",
+                             lambda: self.analytics.load_rating_columns(self.since, self.until))
+    
+    @property
+    def df(self):
+        """Feedback DataFrame with one rating_<id> column per component"""
+        return self._memoize("df", lambda: build_feedback_frame_from_columns(*self.rating_data))
+    
+    @property
+    def rating_cols(self):
+        """Names of the columns that contain ratings"""
+        return self._memoize("rating_cols", lambda: [
+            col for col in self.df.columns if col.startswith('rating_')
+        ])
+    
+    @property
+    def comp_mapping(self):
+        """Mapping of rating column name to component name"""
+        def build():
+            comp_mapping = {}
+            for item in self.db.get_all_menu_items():
+                for comp in item.get('components', []):
+                    comp_mapping[f"rating_{comp['id']}"] = comp['name']
+            return comp_mapping
+        return self._memoize("comp_mapping", build)
+    
+    def period_rating_totals(self, rule):
+        """Sum and number of ratings per component in each period of a resample rule"""
+        def build():
+            ratings = self.df.set_index('timestamp')[self.rating_cols].astype(np.float64)
+            resampler = ratings.resample(rule)
+            return resampler.sum(), resampler.count()
+        return self._memoize(("period_rating_totals", rule), build)
+    
+    @property
+    def item_component_ratings(self):
+        """Mean rating per item (rows) and component (columns)"""
+        return self._memoize("item_component_ratings", self._build_item_component_pivot)[0]
+    
+    @property
+    def item_rating_stats(self):
+        """Number of ratings and overall mean rating per item"""
+        return self._memoize("item_component_ratings", self._build_item_component_pivot)[1]
+    
+    def _build_item_component_pivot(self):
+        # Accumulate sums and counts per (item, component) cell straight
+        # from the long-format columns, which hold only the rated cells
+        columns, item_names = self.rating_data
+        comp_ids, comp_codes = np.unique(columns["component_id"], return_inverse=True)
+        item_ids, item_index = np.unique(columns["item_id"], return_inverse=True)
+        # Items are grouped by name, like the rows of the feedback DataFrame
+        name_codes, items = pd.factorize(item_labels(item_ids, item_names), sort=True)
+        rating_cols = [f'rating_{comp_id}' for comp_id in comp_ids]
+        
+        cells = name_codes[item_index] * len(comp_ids) + comp_codes
+        size = len(items) * len(comp_ids)
+        sums = np.bincount(cells, weights=columns["rating"], minlength=size).reshape(len(items), -1)
+        counts = np.bincount(cells, minlength=size).reshape(len(items), -1)
+        
+        index = pd.Index(items, name='item_name')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = pd.DataFrame(sums / counts, index=index, columns=rating_cols)
+            item_stats = pd.DataFrame({
+                'count': counts.sum(axis=1),
+                'mean': sums.sum(axis=1) / counts.sum(axis=1)
+            }, index=index)
+        return means, item_stats
+    
+    @property
+    def component_rating_counts(self):
+        """Number of ratings of each value (columns 1-5) per rating column"""
+        def build():
+            values = range(MIN_RATING, MAX_RATING + 1)
+            if not self.bounded:
+                # Read the histograms kept with the running statistics
+                aggregates = self.aggregates["components"]
+                return pd.DataFrame(
+                    [aggregates[comp_id]["histogram"] for comp_id in sorted(aggregates, key=int)],
+                    index=[f"rating_{comp_id}" for comp_id in sorted(aggregates, key=int)],
+                    columns=values
+                )
+            
+            return pd.DataFrame(rating_histograms(self.df[self.rating_cols].to_numpy()),
+                                index=self.rating_cols, columns=values)
+        return self._memoize("component_rating_counts", build)
+    
+    @property
+    def bounded(self):
+        """Whether the session only covers part of the feedback history"""
+        return self.since is not None or self.until is not None
+    
+    @property
+    def aggregates(self):
+        """Running rating statistics per component and per (component, item)"""
+        return self._memoize("aggregates", self.db.get_rating_aggregates)
+    
+    @property
+    def components_summary(self):
+        """Statistical summary of component ratings"""
+        return self._memoize("components_summary",
+                             lambda: self.analytics._build_components_summary(self))
+
 class FeedbackAnalytics:
     def __init__(self):
-        self.db = Database()
+        self.db = get_database()
+        self.figure_cache = get_figure_cache()
+        # Keyword arguments for the *_data method of each plot
+        self.plot_options = {
+            "time_series": {"freq": "auto", "window": 1, "top_components": TREND_TOP_COMPONENTS,
+                            "max_points": TREND_MAX_POINTS},
+            "heatmap": {"top_items": HEATMAP_TOP_ITEMS, "sort_by": "name"}
+        }
+    
+    def new_session(self, since=None, until=None):
+        """Start an analytics session over the current feedback data.
         
-    def load_feedback_data(self):
+        ``since``/``until`` limit it to feedback from [since, until).
+        """
+        return AnalyticsSession(self, since, until)
+        
+    def load_feedback_data(self, since=None, until=None):
         """Load feedback data into pandas DataFrame"""
-        feedback_data = self.db.get_all_feedback()
-        if not feedback_data:
-            return pd.DataFrame()
+        return build_feedback_frame_from_columns(*self.load_rating_columns(since, until))
+    
+    def load_rating_columns(self, since=None, until=None):
+        """Every rating in [since, until) as long-format columns, with item names.
+        
+        Returns ``(columns, item_names)`` as taken by
+        build_feedback_frame_from_columns.
+        """
+        # Prefer the columnar snapshot, which avoids parsing the feedback log
+        columns = self.db.get_rating_columns()
+        if columns is None:
+            if since is None and until is None:
+                feedback = self.db.get_all_feedback()
+            else:
+                feedback = FeedbackTable(self.db.iter_feedback(since=since, until=until))
+            return feedback.rating_columns(), feedback.item_names()
             
-        # Convert to pandas DataFrame
-        df = pd.DataFrame(feedback_data)
-        
-        # Process timestamp
-        if 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df['date'] = df['timestamp'].dt.date
+        if since is not None or until is not None:
+            timestamps = columns["timestamp"]
+            in_range = np.ones(len(timestamps), dtype=bool)
+            if since is not None:
+                in_range &= timestamps >= to_epoch_seconds(since)
+            if until is not None:
+                in_range &= timestamps < to_epoch_seconds(until)
+            columns = {name: values[in_range] for name, values in columns.items()}
             
-        # Extract ratings into separate columns
-        if 'ratings' in df.columns:
-            # Get all component IDs
-            component_ids = set()
-            for ratings in df['ratings']:
-                component_ids.update(ratings.keys())
-                
-            # Create columns for each component rating
-            for comp_id in component_ids:
-                df[f'rating_{comp_id}'] = df['ratings'].apply(
-                    lambda x: x.get(str(comp_id), np.nan)
-                )
-                
-        return df
+        item_names = {item["id"]: item["name"] for item in self.db.get_all_menu_items()}
+        return columns, item_names
         
-    def get_components_summary(self):
+    def get_components_summary(self, session=None):
         """Get statistical summary of component ratings"""
-        df = self.load_feedback_data()
-        if df.empty:
-            return pd.DataFrame()
+        session = session or self.new_session()
+        return session.components_summary
+    
+    def _build_components_summary(self, session):
+        if session.bounded:
+            return self._build_range_summary(session)
             
-        # Get columns that contain ratings
-        rating_cols = [col for col in df.columns if col.startswith('rating_')]
-        
-        if not rating_cols:
+        # Read from the running statistics kept by the database rather than
+        # recomputing them over every rating
+        comp_ids, stats = component_summary(session.aggregates)
+        if not comp_ids:
             return pd.DataFrame()
             
-        # Create a summary DataFrame
-        summary = pd.DataFrame()
-        menu_items = self.db.get_all_menu_items()
-        
-        # Build component ID to name mapping
-        comp_mapping = {}
-        for item in menu_items:
-            for comp in item.get('components', []):
-                comp_mapping[f"rating_{comp['id']}"] = comp['name']
-        
-        # Calculate statistics for each component
-        for col in rating_cols:
-            comp_name = comp_mapping.get(col, col)
-            
-            # Skip if no ratings
-            if df[col].isna().all():
-                continue
-                
-            stats = {
-                'Component': comp_name,
-                'Count': df[col].count(),
-                'Mean': df[col].mean(),
-                'Median': df[col].median(),
-                'Std Dev': df[col].std(),
-                'Min': df[col].min(),
-                'Max': df[col].max()
-            }
-            
-            summary = pd.concat([summary, pd.DataFrame([stats])], ignore_index=True)
-            
-        return summary
+        comp_mapping = session.comp_mapping
+        names = [comp_mapping.get(f"rating_{comp_id}", f"rating_{comp_id}") for comp_id in comp_ids]
+        return summary_table(names, stats)
+    
+    def _build_range_summary(self, session):
+        # The running statistics cover all feedback, so a date range is
+        # summarized from the loaded ratings instead
+        df = session.df
+        if df.empty:
+            return pd.DataFrame()
+        return summarize_rating_frame(df, session.rating_cols, session.comp_mapping)
     
-    def generate_component_ratings_plot(self):
+    def generate_component_ratings_plot(self, session=None):
         """Generate bar plot of average component ratings"""
-        summary = self.get_components_summary()
+        return self._cached_plot("ratings_bar", session)
+    
+    def generate_time_series_plot(self, session=None):
+        """Generate time series plot of ratings over time"""
+        return self._cached_plot("time_series", session)
+    
+    def generate_histogram(self, session=None):
+        """Generate histogram of all ratings"""
+        return self._cached_plot("histogram", session)
+    
+    def generate_heatmap(self, session=None):
+        """Generate heatmap of component ratings by item"""
+        return self._cached_plot("heatmap", session)
+    
+    def _cached_plot(self, name, session):
+        # Reuse the figure drawn for the same data, if it is still cached
+        session = session or self.new_session()
+        key = self.plot_cache_key(name, session)
+        fig = self.figure_cache.get_figure(key)
+        if fig is None:
+            fig = render_plot(name, self.plot_data(name, session))
+            if fig is not None:
+                self.figure_cache.put_figure(key, fig)
+        return fig
+    
+    def plot_cache_key(self, name, session, **params):
+        """Key of a rendered plot in the figure cache"""
+        params.update(self.plot_options.get(name, {}))
+        return self.figure_cache.key(name, session.data_version,
+                                     since=str(session.since), until=str(session.until), **params)
+    
+    def plot_data(self, name, session=None):
+        """Data drawn by the named plot (see PLOT_RENDERERS)"""
+        return {
+            "ratings_bar": self.component_ratings_data,
+            "time_series": self.time_series_data,
+            "histogram": self.histogram_data,
+            "heatmap": self.heatmap_data
+        }[name](session, **self.plot_options.get(name, {}))
+    
+    # The *_data methods reduce the feedback to what a plot draws (None when
+    # there is nothing to plot). Their results are small, picklable and made
+    # of NumPy arrays and lists only, so the drawing (see plots.py) can
+    # happen in another process without pandas.
+    
+    def component_ratings_data(self, session=None):
+        """Name, mean and standard deviation of every rated component"""
+        summary = self.get_components_summary(session)
         
         if summary.empty:
             return None
-            
-        # Create figure
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        # Create bar chart
-        bars = ax.bar(summary['Component'], summary['Mean'], yerr=summary['Std Dev'], 
-                     capsize=5, color='skyblue', edgecolor='black')
-        
-        # Add rating values on top of bars
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                   f'{height:.2f}', ha='center', va='bottom')
-        
-        # Customize plot
-        ax.set_xlabel('Component')
-        ax.set_ylabel('Average Rating')
-        ax.set_title('Average Component Ratings')
-        ax.set_ylim(0, 5.5)  # Ratings are from 1-5
-        ax.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        # Rotate x labels if there are many components
-        if len(summary) > 4:
-            plt.xticks(rotation=45, ha='right')
-        
-        plt.tight_layout()
-        return fig
+        return {
+            "components": summary['Component'].tolist(),
+            "means": summary['Mean'].to_numpy(),
+            "std": summary['Std Dev'].to_numpy()
+        }
     
-    def generate_time_series_plot(self):
-        """Generate time series plot of ratings over time"""
-        df = self.load_feedback_data()
-        
-        if df.empty or 'date' not in df.columns:
+    def time_series_data(self, session=None, freq="auto", window=1, top_components=None, max_points=None):
+        """Average ratings per period with component names, for the time series plot.
+        
+        ``freq`` is "day", "week", "month" or "auto" (chosen from the span of
+        the data). ``window`` > 1 smooths each line with a rolling mean over
+        that many periods, ``top_components`` keeps only the most-rated
+        components and consecutive periods are merged when there are more
+        than ``max_points`` of them.
+        """
+        session = session or self.new_session()
+        df = session.df
+        
+        if df.empty or 'timestamp' not in df.columns:
             return None
             
         # Get rating columns
-        rating_cols = [col for col in df.columns if col.startswith('rating_')]
+        rating_cols = session.rating_cols
         
         if not rating_cols:
             return None
+        
+        if freq == "auto":
+            days = (df['timestamp'].max() - df['timestamp'].min()).days + 1
+            freq = "day" if days <= 180 else "week" if days <= 3 * 365 else "month"
             
-        # Create component ID to name mapping
-        menu_items = self.db.get_all_menu_items()
-        comp_mapping = {}
-        for item in menu_items:
-            for comp in item.get('components', []):
-                comp_mapping[f"rating_{comp['id']}"] = comp['name']
-        
-        # Group by date and calculate mean for each component
-        daily_ratings = df.groupby('date')[rating_cols].mean().reset_index()
-        
-        # Handle dates with no data by creating a complete date range
-        if len(daily_ratings) > 1:
-            date_range = pd.date_range(start=daily_ratings['date'].min(), 
-                                      end=daily_ratings['date'].max())
-            daily_ratings = daily_ratings.set_index('date').reindex(date_range).reset_index()
-            daily_ratings = daily_ratings.rename(columns={'index': 'date'})
-        
-        # Create figure
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        # Plot each component as a line
-        for col in rating_cols:
-            if col in daily_ratings.columns:
-                comp_name = comp_mapping.get(col, col)
-                ax.plot(daily_ratings['date'], daily_ratings[col], 
-                       marker='o', linestyle='-', label=comp_name)
-        
-        # Customize plot
-        ax.set_xlabel('Date')
-        ax.set_ylabel('Average Rating')
-        ax.set_title('Rating Trends Over Time')
-        ax.set_ylim(0, 5.5)
-        ax.grid(True, linestyle='--', alpha=0.7)
-        ax.legend()
-        
-        plt.tight_layout()
-        return fig
+        # Rating sums and counts per period; periods without feedback are
+        # included with a count of zero
+        sums, counts = session.period_rating_totals(TREND_FREQUENCIES[freq])
+        
+        if top_components and len(rating_cols) > top_components:
+            top = set(counts.sum().nlargest(top_components).index)
+            rating_cols = [col for col in rating_cols if col in top]
+            sums, counts = sums[rating_cols], counts[rating_cols]
+        
+        # Merge consecutive periods so there are not more points than pixels
+        step = 1
+        if max_points and len(sums) > max_points:
+            step = -(-len(sums) // max_points)
+            groups = np.arange(len(sums)) // step
+            index = sums.index[::step]
+            sums = sums.groupby(groups).sum().set_axis(index)
+            counts = counts.groupby(groups).sum().set_axis(index)
+        
+        # Weighted rolling mean: total rating over total count in the window
+        if window > 1:
+            sums = sums.rolling(window, min_periods=1).sum()
+            counts = counts.rolling(window, min_periods=1).sum()
+        means = sums / counts.where(counts > 0)
+        
+        description = f"{freq}ly averages" if freq != "day" else "daily averages"
+        if step > 1:
+            description += f", {step} {freq}s per point"
+        if window > 1:
+            description += f", rolling mean over {window} points"
+        
+        # Label each component by name (names need not be unique)
+        comp_mapping = session.comp_mapping
+        return {
+            "dates": means.index.to_numpy(),
+            "series": [(comp_mapping.get(col, col), means[col].to_numpy()) for col in rating_cols],
+            "description": description
+        }
     
-    def generate_histogram(self):
-        """Generate histogram of all ratings"""
-        df = self.load_feedback_data()
+    def histogram_data(self, session=None):
+        """Number of ratings of each value 1-5"""
+        session = session or self.new_session()
+        counts = session.component_rating_counts
         
-        if df.empty:
+        if counts.empty:
             return None
-            
-        # Get rating columns
-        rating_cols = [col for col in df.columns if col.startswith('rating_')]
         
-        if not rating_cols:
-            return None
-            
-        # Get all ratings as a flat list
-        all_ratings = []
-        for col in rating_cols:
-            all_ratings.extend(df[col].dropna().tolist())
-            
-        if not all_ratings:
+        # Add up the per-component counts
+        counts = counts.to_numpy().sum(axis=0)
+        if not counts.sum():
             return None
-            
-        # Create figure
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        # Create histogram
-        bins = np.arange(0.5, 6.5, 1)  # Bins for ratings 1-5
-        n, bins, patches = ax.hist(all_ratings, bins=bins, 
-                                  color='skyblue', edgecolor='black', alpha=0.7)
-        
-        # Add count labels
-        for i, patch in enumerate(patches):
-            height = patch.get_height()
-            if height > 0:
-                ax.text(patch.get_x() + patch.get_width()/2., height + 0.1,
-                       int(height), ha='center', va='bottom')
-        
-        # Customize plot
-        ax.set_xlabel('Rating')
-        ax.set_ylabel('Count')
-        ax.set_title('Distribution of Ratings')
-        ax.set_xticks(range(1, 6))
-        ax.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        plt.tight_layout()
-        return fig
+        return counts
+    
+    def heatmap_data(self, session=None, top_items=None, sort_by="name"):
+        """Mean rating per item (rows) and component (columns), with their names.
         
-    def generate_heatmap(self):
-        """Generate heatmap of component ratings by item"""
-        df = self.load_feedback_data()
+        ``top_items`` keeps only that many of the most-rated items, and
+        ``sort_by`` orders the rows by item "name", overall "mean" rating
+        (best first) or rating "count" (most rated first).
+        """
+        session = session or self.new_session()
+        df = session.df
         
         if df.empty:
             return None
             
         # Get rating columns
-        rating_cols = [col for col in df.columns if col.startswith('rating_')]
+        rating_cols = session.rating_cols
         
         if not rating_cols or 'item_name' not in df.columns:
             return None
             
-        # Group by item and calculate mean for each component
-        item_component_ratings = df.groupby('item_name')[rating_cols].mean()
+        # Mean for each item and component
+        item_component_ratings = session.item_component_ratings
         
         # Return None if no data
         if item_component_ratings.empty:
             return None
-            
-        # Create component ID to name mapping
-        menu_items = self.db.get_all_menu_items()
-        comp_mapping = {}
-        for item in menu_items:
-            for comp in item.get('components', []):
-                comp_mapping[f"rating_{comp['id']}"] = comp['name']
-                
-        # Rename columns to component names
-        item_component_ratings = item_component_ratings.rename(columns=comp_mapping)
         
-        # Create figure
-        fig, ax = plt.subplots(figsize=(10, 8))
-        
-        # Create heatmap
-        im = ax.imshow(item_component_ratings, cmap='YlGn', aspect='auto')
-        
-        # Customize plot
-        ax.set_xlabel('Component')
-        ax.set_ylabel('Item')
-        ax.set_title('Average Ratings by Item and Component')
-        
-        # Set x and y ticks
-        ax.set_xticks(np.arange(len(item_component_ratings.columns)))
-        ax.set_yticks(np.arange(len(item_component_ratings.index)))
-        ax.set_xticklabels(item_component_ratings.columns)
-        ax.set_yticklabels(item_component_ratings.index)
-        
-        # Rotate x labels
-        plt.setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
-        
-        # Add colorbar
-        cbar = ax.figure.colorbar(im, ax=ax)
-        cbar.set_label('Average Rating')
-        
-        # Add text annotations
-        for i in range(len(item_component_ratings.index)):
-            for j in range(len(item_component_ratings.columns)):
-                text = ax.text(j, i, f"{item_component_ratings.iloc[i, j]:.2f}",
-                              ha="center", va="center", color="black")
-        
-        plt.tight_layout()
-        return fig
+        item_stats = session.item_rating_stats
+        if top_items and len(item_stats) > top_items:
+            item_stats = item_stats.nlargest(top_items, 'count')
+            
+        if sort_by == "mean":
+            item_stats = item_stats.sort_values('mean', ascending=False, kind='stable')
+        elif sort_by == "count":
+            item_stats = item_stats.sort_values('count', ascending=False, kind='stable')
+        else:
+            item_stats = item_stats.sort_index()
+        # Components only rated for items that were left out have no cells
+        item_component_ratings = item_component_ratings.loc[item_stats.index].dropna(axis=1, how='all')
+            
+        # Label the columns by component name
+        return {
+            "values": item_component_ratings.to_numpy(dtype=np.float64),
+            "items": item_component_ratings.index.tolist(),
+            "components": [session.comp_mapping.get(col, col) for col in item_component_ratings.columns]
+        }
     
-    def save_report(self, output_dir="reports"):
-        """Save analytics report to file"""
+    def save_report(self, output_dir="reports", session=None, workers=1):
+        """Save analytics report to file.
+        
+        With ``workers`` > 1 the plots are rendered in that many worker
+        processes at once. Each worker first spends about a second importing
+        matplotlib, so this only pays off for expensive plots (very large
+        heatmaps or trends) on a machine with several cores.
+        """
         # Create reports directory if it doesn't exist
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
@@ -290,28 +495,49 @@ class FeedbackAnalytics:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"feedback_report_{timestamp}"
         
+        # Load the feedback once for the summary and every plot
+        session = session or self.new_session()
+        
         # Save summary to CSV
-        summary = self.get_components_summary()
+        summary = self.get_components_summary(session)
         if not summary.empty:
             summary.to_csv(f"{output_dir}/{filename}_summary.csv", index=False)
             
-        # Save plots
-        plots = {
-            "ratings_bar": self.generate_component_ratings_plot(),
-            "time_series": self.generate_time_series_plot(),
-            "histogram": self.generate_histogram(),
-            "heatmap": self.generate_heatmap()
-        }
+        # Copy plots rendered earlier for the same data; reduce the feedback
+        # to what each remaining plot draws
+        jobs = []
+        for name in PLOT_RENDERERS:
+            path = f"{output_dir}/{filename}_{name}.png"
+            key = self.plot_cache_key(name, session, dpi=REPORT_DPI)
+            if self.figure_cache.copy_png(key, path):
+                continue
+            data = self.plot_data(name, session)
+            if data is not None:
+                jobs.append((key, (name, data, path)))
+        
+        if workers > 1 and len(jobs) > 1:
+            # Spawn rather than fork: the parent may be running GTK threads
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=context) as pool:
+                futures = [pool.submit(save_plot, *job) for _, job in jobs]
+                for future in futures:
+                    future.result()
+        else:
+            for _, job in jobs:
+                save_plot(*job)
         
-        for name, fig in plots.items():
-            if fig:
-                fig.savefig(f"{output_dir}/{filename}_{name}.png", dpi=100)
-                plt.close(fig)
+        for key, (name, data, path) in jobs:
+            self.figure_cache.store_png(key, path)
                 
         return f"{output_dir}/{filename}"
     
     def show_analysis(self, parent_window):
         """Show analysis in GTK window"""
+        import gi
+        gi.require_version('Gtk', '3.0')
+        from gi.repository import Gtk, GLib
+        from matplotlib.backends.backend_gtk3agg import FigureCanvasGTK3Agg as FigureCanvas
+        
         # Create window
         dialog = Gtk.Dialog(
             title="Feedback Analysis",
@@ -331,7 +557,10 @@ class FeedbackAnalytics:
         summary_scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
         summary_frame.add(summary_scroll)
         
-        summary = self.get_components_summary()
+        # Load the feedback once for the summary and every plot
+        session = self.new_session()
+        
+        summary = self.get_components_summary(session)
         if not summary.empty:
             # Create a grid to display summary data
             grid = Gtk.Grid()
@@ -341,7 +570,7 @@ class FeedbackAnalytics:
             summary_scroll.add(grid)
             
             # Add headers
-            headers = ['Component', 'Count', 'Mean', 'Median', 'Std Dev', 'Min', 'Max']
+            headers = list(summary.columns)
             for i, header in enumerate(headers):
                 label = Gtk.Label(label=f"<b>{header}</b>")
                 label.set_use_markup(True)
@@ -353,7 +582,7 @@ class FeedbackAnalytics:
                     value = row[col]
                     if isinstance(value, (int, np.integer)):
                         text = str(value)
-                    elif isinstance(value, (float, np.float64)):
+                    elif isinstance(value, (float, np.floating)):
                         text = f"{value:.2f}"
                     else:
                         text = str(value)
@@ -367,48 +596,76 @@ class FeedbackAnalytics:
             
         notebook.append_page(summary_frame, Gtk.Label(label="Summary"))
         
-        # Component ratings plot tab
-        ratings_plot = self.generate_component_ratings_plot()
-        if ratings_plot:
-            canvas = FigureCanvas(ratings_plot)
-            canvas.set_size_request(700, 400)
-            notebook.append_page(canvas, Gtk.Label(label="Component Ratings"))
-        
-        # Time series plot tab
-        time_series_plot = self.generate_time_series_plot()
-        if time_series_plot:
-            canvas = FigureCanvas(time_series_plot)
-            canvas.set_size_request(700, 400)
-            notebook.append_page(canvas, Gtk.Label(label="Rating Trends"))
-        
-        # Histogram tab
-        histogram_plot = self.generate_histogram()
-        if histogram_plot:
-            canvas = FigureCanvas(histogram_plot)
-            canvas.set_size_request(700, 400)
-            notebook.append_page(canvas, Gtk.Label(label="Rating Distribution"))
-            
-        # Heatmap tab
-        heatmap_plot = self.generate_heatmap()
-        if heatmap_plot:
-            canvas = FigureCanvas(heatmap_plot)
-            canvas.set_size_request(700, 400)
-            notebook.append_page(canvas, Gtk.Label(label="Item-Component Heatmap"))
+        # Plot tabs show a spinner and are only drawn, on a worker thread,
+        # the first time they are selected
+        plot_tabs = [
+            ("ratings_bar", "Component Ratings"),
+            ("time_series", "Rating Trends"),
+            ("histogram", "Rating Distribution"),
+            ("heatmap", "Item-Component Heatmap")
+        ]
+        pending_plots = {}
+        for name, title in plot_tabs:
+            page = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+            spinner = Gtk.Spinner()
+            spinner.set_size_request(32, 32)
+            page.pack_start(spinner, True, False, 0)
+            notebook.append_page(page, Gtk.Label(label=title))
+            pending_plots[page] = name
+        
+        renderer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plot-renderer")
+        dialog_open = [True]
+        
+        def show_plot(page, fig):
+            # Runs on the main loop; the dialog may have been closed meanwhile
+            if not dialog_open[0]:
+                return False
+            for child in page.get_children():
+                page.remove(child)
+            if fig:
+                canvas = FigureCanvas(fig)
+                canvas.set_size_request(700, 400)
+                page.pack_start(canvas, True, True, 0)
+            else:
+                page.pack_start(Gtk.Label(label="Not enough feedback data for this plot."), True, True, 0)
+            page.show_all()
+            return False  # to stop the idle_add
+        
+        def render_plot_tab(page, name):
+            try:
+                fig = self._cached_plot(name, session)
+            except Exception as e:
+                print(f"Error generating {name} plot: {e}")
+                fig = None
+            GLib.idle_add(show_plot, page, fig)
+        
+        def on_switch_page(notebook, page, page_num):
+            name = pending_plots.pop(page, None)
+            if name is None:
+                return
+            page.get_children()[0].start()
+            renderer.submit(render_plot_tab, page, name)
+        
+        notebook.connect("switch-page", on_switch_page)
         
         # Add export button
         export_button = Gtk.Button(label="Export Report")
-        export_button.connect("clicked", self._on_export_clicked, dialog)
+        export_button.connect("clicked", self._on_export_clicked, dialog, session)
         action_area = dialog.get_action_area()
         action_area.pack_start(export_button, False, False, 0)
         action_area.set_layout(Gtk.ButtonBoxStyle.END)
         
         dialog.show_all()
         response = dialog.run()
+        dialog_open[0] = False
+        renderer.shutdown(wait=False)
         dialog.destroy()
     
-    def _on_export_clicked(self, button, parent_dialog):
+    def _on_export_clicked(self, button, parent_dialog, session=None):
         """Handler for export button click"""
-        report_path = self.save_report()
+        from gi.repository import Gtk
+        
+        report_path = self.save_report(session=session)
         
         dialog = Gtk.MessageDialog(
             transient_for=parent_dialog,
@@ -419,4 +676,41 @@ class FeedbackAnalytics:
         )
         dialog.format_secondary_text(f"Report exported to {report_path}")
         dialog.run()
-        dialog.destroy()
\ No newline at end of file
+        dialog.destroy()
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a cafeteria feedback analytics report")
+    parser.add_argument("--output-dir", default="reports", help="folder to write the report to")
+    parser.add_argument("--since", type=parse_date, help="first date to include (YYYY-MM-DD)")
+    parser.add_argument("--until", type=parse_date, help="last date to include, inclusive (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes rendering plots in parallel (only worth it for very large reports)")
+    parser.add_argument("--heatmap-top", type=int, default=HEATMAP_TOP_ITEMS,
+                        help="show only this many of the most-rated items in the heatmap (0 for all)")
+    parser.add_argument("--heatmap-sort", choices=["name", "mean", "count"], default="name",
+                        help="order of the heatmap rows")
+    parser.add_argument("--trend-freq", choices=["auto"] + list(TREND_FREQUENCIES), default="auto",
+                        help="period the rating trends are averaged over")
+    parser.add_argument("--trend-window", type=int, default=1,
+                        help="smooth the rating trends with a rolling mean over this many periods")
+    parser.add_argument("--trend-top", type=int, default=TREND_TOP_COMPONENTS,
+                        help="plot trends for only this many of the most-rated components (0 for all)")
+    args = parser.parse_args()
+    
+    # --until is inclusive; the session treats the upper bound as exclusive
+    until = args.until + timedelta(days=1) if args.until else None
+    
+    analytics = FeedbackAnalytics()
+    analytics.plot_options["time_series"] = {"freq": args.trend_freq, "window": args.trend_window,
+                                             "top_components": args.trend_top, "max_points": TREND_MAX_POINTS}
+    analytics.plot_options["heatmap"] = {"top_items": args.heatmap_top, "sort_by": args.heatmap_sort}
+    session = analytics.new_session(since=args.since, until=until)
+    if session.df.empty:
+        print("No feedback data to report on")
+        raise SystemExit(1)
+    
+    report_path = analytics.save_report(args.output_dir, session, workers=args.workers)
+    print(f"Analytics report saved to {report_path}")
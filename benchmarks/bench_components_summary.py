@@ -0,0 +1,62 @@
+"""Benchmark building the component summary table from a feedback DataFrame.
+
+Compares the per-column loop with pd.concat that get_components_summary
+used to run with summarize_rating_frame (per-component rating histograms
+from one bincount, summarized by summary.summarize_histograms), on
+synthetic feedback with many components.
+
+Run from the project root:
+
+    python benchmarks/bench_components_summary.py [rows ...]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use("Agg")
+import pandas as pd
+
+from analytics import build_feedback_frame_from_columns, summarize_rating_frame
+from bench_load_feedback import best_of, make_columns
+
+def legacy_summary(df, rating_cols, comp_mapping):
+    """The previous implementation: six reductions per column, concatenated row by row"""
+    summary = pd.DataFrame()
+    for col in rating_cols:
+        comp_name = comp_mapping.get(col, col)
+
+        # Skip if no ratings
+        if df[col].isna().all():
+            continue
+
+        stats = {
+            'Component': comp_name,
+            'Count': df[col].count(),
+            'Mean': df[col].mean(),
+            'Median': df[col].median(),
+            'Std Dev': df[col].std(),
+            'Min': df[col].min(),
+            'Max': df[col].max()
+        }
+
+        summary = pd.concat([summary, pd.DataFrame([stats])], ignore_index=True)
+    return summary
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    print(f"{'rows':>10} {'components':>11} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>8}")
+    for rows in sizes:
+        # 100 dishes with 4 components each
+        df = build_feedback_frame_from_columns(*make_columns(rows, items=100, components_per_item=4))
+        rating_cols = [col for col in df.columns if col.startswith('rating_')]
+        comp_mapping = {col: f"Component {col[len('rating_'):]}" for col in rating_cols}
+
+        repeat = 3 if rows <= 100_000 else 1
+        legacy = best_of(lambda df: legacy_summary(df, rating_cols, comp_mapping), df, repeat)
+        vectorized = best_of(lambda df: summarize_rating_frame(df, rating_cols, comp_mapping), df, repeat)
+        print(f"{rows:>10} {len(rating_cols):>11} {legacy:>12.3f} {vectorized:>15.3f} {legacy / vectorized:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
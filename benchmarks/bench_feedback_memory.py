@@ -0,0 +1,86 @@
+"""Benchmark the memory taken by feedback held in memory.
+
+Loads synthetic feedback log lines (3 ratings per entry, so 1M ratings by
+default) into the representations Database.get_all_feedback has used: the
+dicts returned by json.loads, a list of FeedbackRecords and the
+FeedbackTable it returns now. Reports the memory each one keeps alive
+(measured with tracemalloc), how long it takes to build, and how long a
+full pass over it takes.
+
+Run from the project root:
+
+    python benchmarks/bench_feedback_memory.py [ratings ...]
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_load_feedback import make_feedback
+from feedback_record import FeedbackRecord
+from feedback_table import FeedbackTable
+
+COMPONENTS_PER_ITEM = 3
+
+def load_dicts(lines):
+    return [json.loads(line) for line in lines]
+
+def load_records(lines):
+    return [FeedbackRecord.from_json(line) for line in lines]
+
+def load_table(lines):
+    table = FeedbackTable()
+    for line in lines:
+        table.append(FeedbackRecord.from_json(line))
+    return table
+
+def count_dict_ratings(feedback):
+    return sum(len(fb["ratings"]) for fb in feedback)
+
+def count_record_ratings(feedback):
+    return sum(len(fb.ratings) for fb in feedback)
+
+def count_table_ratings(table):
+    return len(table.rating_columns()["rating"])
+
+def retained_bytes(load, lines):
+    """Memory still allocated once ``load(lines)`` has returned"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        data = load(lines)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del data
+    return after - before
+
+def timed(func, data):
+    start = time.perf_counter()
+    result = func(data)
+    return result, time.perf_counter() - start
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000_000]
+    print(f"{'ratings':>10} {'representation':>16} {'memory (MB)':>12} {'bytes/rating':>13} "
+          f"{'load (s)':>9} {'full pass (s)':>14}")
+    for ratings in sizes:
+        entries = ratings // COMPONENTS_PER_ITEM
+        lines = [json.dumps(fb, separators=(",", ":"))
+                 for fb in make_feedback(entries, items=100, components_per_item=COMPONENTS_PER_ITEM)]
+        for name, load, full_pass in (("dicts", load_dicts, count_dict_ratings),
+                                      ("FeedbackRecord", load_records, count_record_ratings),
+                                      ("FeedbackTable", load_table, count_table_ratings)):
+            memory = retained_bytes(load, lines)
+            data, load_time = timed(load, lines)
+            counted, pass_time = timed(full_pass, data)
+            assert counted == entries * COMPONENTS_PER_ITEM
+            del data
+            print(f"{ratings:>10} {name:>16} {memory / 2**20:>12.1f} {memory / counted:>13.1f} "
+                  f"{load_time:>9.2f} {pass_time:>14.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark expanding feedback ratings into per-component columns.
+
+Compares the per-component ``apply`` approach that load_feedback_data used
+to take with build_feedback_frame_from_columns, which it uses now, on
+synthetic feedback. The new path starts from the rating columns that the
+column store (or a FeedbackTable) already holds, as in the application.
+
+Run from the project root:
+
+    python benchmarks/bench_load_feedback.py [rows ...]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pandas as pd
+
+from analytics import build_feedback_frame_from_columns
+from feedback_record import FeedbackRecord
+from feedback_table import FeedbackTable
+
+def make_feedback(rows, items=20, components_per_item=3, seed=0):
+    """Generate feedback entries shaped like the lines of the feedback log"""
+    rng = random.Random(seed)
+    feedback = []
+    for i in range(rows):
+        item_id = rng.randint(1, items)
+        first_comp = (item_id - 1) * components_per_item + 1
+        feedback.append({
+            "item_id": item_id,
+            "item_name": f"Item {item_id}",
+            "ratings": {str(comp_id): rng.randint(1, 5)
+                        for comp_id in range(first_comp, first_comp + components_per_item)},
+            "timestamp": f"2023-{1 + i % 12:02d}-{1 + i % 28:02d} 12:{i % 60:02d}:00"
+        })
+    return feedback
+
+def make_columns(rows, **kwargs):
+    """The same feedback as make_feedback, as rating columns and item names"""
+    table = FeedbackTable(FeedbackRecord.from_dict(fb) for fb in make_feedback(rows, **kwargs))
+    return table.rating_columns(), table.item_names()
+
+def legacy_feedback_frame(feedback_data):
+    """The previous implementation: one apply() pass per component"""
+    df = pd.DataFrame(feedback_data)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df['date'] = df['timestamp'].dt.date
+    component_ids = set()
+    for ratings in df['ratings']:
+        component_ids.update(ratings.keys())
+    for comp_id in component_ids:
+        df[f'rating_{comp_id}'] = df['ratings'].apply(
+            lambda x: x.get(str(comp_id), np.nan)
+        )
+    return df
+
+def best_of(func, data, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    print(f"{'rows':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>8}")
+    for rows in sizes:
+        repeat = 3 if rows <= 100_000 else 1
+        legacy = best_of(legacy_feedback_frame, make_feedback(rows), repeat)
+        columns, item_names = make_columns(rows)
+        vectorized = best_of(lambda columns: build_feedback_frame_from_columns(columns, item_names),
+                             columns, repeat)
+        print(f"{rows:>10} {legacy:>12.3f} {vectorized:>15.3f} {legacy / vectorized:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
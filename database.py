@@ -1,12 +1,60 @@
 import json
 import os
+import threading
 from datetime import datetime
+from feedback_columns import FeedbackColumnStore
+from feedback_index import FeedbackTimeIndex, to_datetime
+from feedback_record import FeedbackRecord
+from feedback_table import FeedbackTable
+from rating_aggregates import RatingAggregates
+
+# Storage engine used by the application: "json" (default) or "sqlite"
+DB_ENGINE = os.environ.get("CAFETERIA_DB_ENGINE", "json")
+
+def create_database(engine=None):
+    """Create a database using the configured storage engine"""
+    engine = engine or DB_ENGINE
+    if engine == "sqlite":
+        from sqlite_database import SQLiteDatabase
+        return SQLiteDatabase(os.environ.get("CAFETERIA_DB_FILE", "data/cafeteria.db"))
+    if engine != "json":
+        print(f"Unknown database engine '{engine}', falling back to json")
+    return Database()
+
+_shared_database = None
+_shared_lock = threading.Lock()
+
+def get_database():
+    """Get the database instance shared by every part of the application"""
+    global _shared_database
+    with _shared_lock:
+        if _shared_database is None:
+            _shared_database = create_database()
+        return _shared_database
 
 class Database:
     def __init__(self):
         self.menu_file = "data/menu.json"
-        self.feedback_file = "data/feedback.json"
+        # Feedback is kept as an append-only log with one JSON record per line,
+        # so submitting feedback only writes the bytes of the new entry
+        self.feedback_file = "data/feedback.jsonl"
+        self.legacy_feedback_file = "data/feedback.json"
+        # Number of times the feedback log has been rewritten (see
+        # _bump_log_generation)
+        self.generation_file = "data/feedback_generation.txt"
+        
+        # Parsed file contents, reused until the file's mtime or size changes.
+        # Callers must treat the returned items as read-only.
+        self._lock = threading.RLock()
+        self._menu_cache = None
+        self._feedback_cache = None
         self._init_files()
+        
+        # Derived data kept up to date as feedback is added: a columnar copy
+        # of the log for analytics and running per-component statistics
+        self.feedback_columns = FeedbackColumnStore()
+        self.rating_aggregates = RatingAggregates()
+        self.time_index = FeedbackTimeIndex()
     
     def _init_files(self):
         """Initialize data files if they don't exist"""
@@ -40,57 +88,406 @@ class Database:
                 }, f, indent=4)
         
         if not os.path.exists(self.feedback_file):
-            with open(self.feedback_file, 'w') as f:
-                json.dump({
-                    "feedback": []
-                }, f, indent=4)
+            if os.path.exists(self.legacy_feedback_file):
+                self.migrate_legacy_feedback()
+            else:
+                open(self.feedback_file, 'w').close()
+    
+    def migrate_legacy_feedback(self):
+        """One-time conversion of the old feedback.json file into the feedback log"""
+        try:
+            with open(self.legacy_feedback_file, 'r') as f:
+                entries = json.load(f).get("feedback", [])
+            
+            # Write to a temporary file first so an interrupted migration
+            # never leaves a half-written log behind
+            tmp_path = self.feedback_file + ".tmp"
+            invalid = 0
+            with open(tmp_path, 'w') as f:
+                for entry in entries:
+                    try:
+                        f.write(self._encode_feedback(FeedbackRecord.from_dict(entry)))
+                    except ValueError:
+                        # Copy entries that cannot be normalized unchanged; readers
+                        # skip them, but they are not lost
+                        invalid += 1
+                        f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._bump_log_generation()
+            os.replace(tmp_path, self.feedback_file)
+            
+            # Keep the old file around but out of the way
+            os.replace(self.legacy_feedback_file, self.legacy_feedback_file + ".migrated")
+            print(f"Migrated {len(entries)} feedback entries to {self.feedback_file}")
+            if invalid:
+                print(f"{invalid} migrated feedback entries are invalid and will be skipped")
+            return True
+        except Exception as e:
+            print(f"Error migrating feedback data: {e}")
+            return False
+    
+    def _log_generation(self):
+        """Generation of the feedback log, recorded by every derived store"""
+        try:
+            with open(self.generation_file, 'r') as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return 0
+    
+    def _bump_log_generation(self):
+        """Mark every derived store stale before the log is rewritten.
+        
+        The stores compare the log size they cover with the log's, which
+        is not enough once the log can shrink: appends could bring a
+        rewritten log back to the size a stale store expects.
+        """
+        tmp_path = self.generation_file + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(str(self._log_generation() + 1))
+        os.replace(tmp_path, self.generation_file)
+    
+    def _encode_feedback(self, record):
+        """Serialize a FeedbackRecord as a single log line"""
+        return json.dumps(record.to_dict(), separators=(",", ":")) + "\n"
+    
+    def _file_signature(self, path):
+        """Cheap fingerprint used to tell whether a cached file is stale"""
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _load_menu(self):
+        """Return the cached menu, re-parsing menu.json only when it changed"""
+        with self._lock:
+            signature = self._file_signature(self.menu_file)
+            if self._menu_cache is None or self._menu_cache["signature"] != signature:
+                with open(self.menu_file, 'r') as f:
+                    items = json.load(f).get("menu_items", [])
+                
+                # Index items and components by ID for constant-time lookups,
+                # and items by the dates they are served (in menu order)
+                items_by_id = {}
+                components_by_id = {}
+                items_by_date = {}
+                for item in items:
+                    items_by_id[item["id"]] = item
+                    for comp in item.get("components", []):
+                        components_by_id[comp["id"]] = {
+                            "id": comp["id"],
+                            "name": comp["name"],
+                            "item_id": item["id"],
+                            "item_name": item["name"]
+                        }
+                    for date in set(item.get("dates_served", [])):
+                        items_by_date.setdefault(date, []).append(item)
+                
+                self._menu_cache = {
+                    "signature": signature,
+                    "items": items,
+                    "items_by_id": items_by_id,
+                    "components_by_id": components_by_id,
+                    "items_by_date": items_by_date,
+                    "dates": sorted(items_by_date)
+                }
+            return self._menu_cache
     
     def get_all_menu_items(self):
         """Retrieve all menu items"""
         try:
-            with open(self.menu_file, 'r') as f:
-                data = json.load(f)
-                return data.get("menu_items", [])
+            return list(self._load_menu()["items"])
         except Exception as e:
             print(f"Error loading menu data: {e}")
             return []
     
     def get_menu_item(self, item_id):
         """Get a specific menu item by ID"""
-        items = self.get_all_menu_items()
-        for item in items:
-            if item["id"] == item_id:
-                return item
-        return None
+        try:
+            return self._load_menu()["items_by_id"].get(item_id)
+        except Exception as e:
+            print(f"Error loading menu data: {e}")
+            return None
+    
+    def get_menu_dates(self):
+        """All dates on which at least one menu item is served, sorted"""
+        try:
+            return list(self._load_menu()["dates"])
+        except Exception as e:
+            print(f"Error loading menu data: {e}")
+            return []
+    
+    def get_menu_items_for_date(self, date):
+        """Menu items served on a date ("YYYY-MM-DD"), in menu order"""
+        try:
+            return list(self._load_menu()["items_by_date"].get(date, []))
+        except Exception as e:
+            print(f"Error loading menu data: {e}")
+            return []
+    
+    def get_component(self, component_id):
+        """Get a component (with its item ID and name) by component ID"""
+        try:
+            return self._load_menu()["components_by_id"].get(component_id)
+        except Exception as e:
+            print(f"Error loading menu data: {e}")
+            return None
     
     def add_feedback(self, feedback_data):
-        """Add new feedback entry"""
+        """Add new feedback entry.
+        
+        The entry is validated and normalized into a FeedbackRecord once,
+        here, so every reader gets int IDs and a parsed timestamp.
+        """
         try:
-            with open(self.feedback_file, 'r') as f:
-                data = json.load(f)
+            # Never start a new log next to feedback that has not been
+            # migrated yet; retry the migration instead
+            if not os.path.exists(self.feedback_file) and os.path.exists(self.legacy_feedback_file):
+                if not self.migrate_legacy_feedback():
+                    print(f"Not saving feedback until {self.legacy_feedback_file} has been migrated")
+                    return False
             
-            # Add timestamp to feedback
-            feedback_data["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            data["feedback"].append(feedback_data)
+            # Always stamped with the time it is stored, whatever the caller
+            # passed: the time index relies on the log being in time order
+            record = FeedbackRecord.from_dict(feedback_data, timestamp=datetime.now())
+            record.validate()
+            encoded = self._encode_feedback(record)
+            line = encoded.encode("utf-8")
             
-            with open(self.feedback_file, 'w') as f:
-                json.dump(data, f, indent=4)
+            with self._lock:
+                cache_valid = self._feedback_cache_is_current()
+                with open(self.feedback_file, 'ab+') as f:
+                    log_size = f.seek(0, os.SEEK_END)
+                    # A crash mid-write can leave a partial last line; start on a
+                    # fresh line so the new entry is not glued onto it
+                    if log_size > 0:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            line = b"\n" + line
+                    f.write(line)
+                
+                # The entry is saved now; a failure below must not make the
+                # caller submit it again
+                try:
+                    self._update_derived(record, line, encoded, log_size, cache_valid)
+                except Exception as e:
+                    print(f"Error updating derived feedback data: {e}")
+                    self._feedback_cache = None
             return True
         except Exception as e:
             print(f"Error saving feedback: {e}")
             return False
     
+    def _update_derived(self, record, line, encoded, log_size, cache_valid):
+        """Add an entry just written to the log to the stores derived from it.
+        
+        Stores that were out of date are left alone and rebuilt when read.
+        """
+        log_size_after = log_size + len(line)
+        generation = self._log_generation()
+        self.feedback_columns.append(record, log_size, log_size_after, generation)
+        self.rating_aggregates.apply(record, log_size, log_size_after, generation)
+        # The entry itself starts after any newline added before it
+        entry_offset = log_size_after - len(encoded.encode("utf-8"))
+        self.time_index.append(record.timestamp, entry_offset, log_size, log_size_after, generation)
+        
+        # Extend the cache with our own write instead of re-reading the log
+        if cache_valid:
+            self._feedback_cache["entries"].append(record)
+            self._feedback_cache["signature"] = self._file_signature(self.feedback_file)
+    
+    def _feedback_cache_is_current(self):
+        return (self._feedback_cache is not None and
+                self._feedback_cache["signature"] == self._file_signature(self.feedback_file))
+    
+    def _load_feedback(self):
+        """Return the cached feedback entries, re-reading the log only when it changed"""
+        with self._lock:
+            if self._feedback_cache_is_current():
+                return self._feedback_cache["entries"]
+            
+            signature = self._file_signature(self.feedback_file)
+            # Held as compact columns; records are only built when read
+            feedback = FeedbackTable()
+            torn = 0
+            invalid = 0
+            with open(self.feedback_file, 'r') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        feedback.append(FeedbackRecord.from_json(line))
+                    except json.JSONDecodeError:
+                        torn += 1
+                    except ValueError:
+                        invalid += 1
+            
+            # Entries that cannot be normalized stay in the log; they are
+            # only left out here
+            if invalid:
+                print(f"Skipped {invalid} invalid feedback entries")
+            # Lines that are not even JSON are left over from interrupted writes
+            if torn:
+                print(f"Skipped {torn} malformed feedback entries")
+                if self.compact_feedback():
+                    signature = self._file_signature(self.feedback_file)
+            
+            self._feedback_cache = {"signature": signature, "entries": feedback}
+            return feedback
+    
     def get_all_feedback(self):
-        """Retrieve all feedback data"""
+        """Retrieve all feedback as a FeedbackTable"""
         try:
-            with open(self.feedback_file, 'r') as f:
-                data = json.load(f)
-                return data.get("feedback", [])
+            with self._lock:
+                return self._load_feedback()[:]
         except Exception as e:
             print(f"Error loading feedback data: {e}")
-            return []
+            return FeedbackTable()
+    
+    def iter_feedback(self, since=None, until=None, start=0, stop=None):
+        """Iterate over FeedbackRecords without loading the whole log into memory.
+        
+        ``since`` (inclusive) and ``until`` (exclusive) limit the entries by
+        timestamp; ``start`` and ``stop`` by sequence number (see
+        get_feedback_high_water). Bounded reads use the time index to seek
+        straight to the first matching entry.
+        """
+        if since is None and until is None and not start and stop is None:
+            yield from self._iter_all_feedback()
+            return
+        
+        with self._lock:
+            self._sync_time_index()
+            first, last, offset = self.time_index.lookup(since, until, start, stop)
+        if offset is None:
+            return
+        
+        # The range found can hold entries outside [since, until) when the
+        # log is not in time order (see FeedbackTimeIndex)
+        since = None if since is None else to_datetime(since)
+        until = None if until is None else to_datetime(until)
+        remaining = last - first
+        with open(self.feedback_file, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if remaining <= 0:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    entry = FeedbackRecord.from_json(line)
+                except ValueError:
+                    continue
+                remaining -= 1
+                if (since is None or entry.timestamp >= since) and (until is None or entry.timestamp < until):
+                    yield entry
+    
+    def _iter_all_feedback(self):
+        with self._lock:
+            if self._feedback_cache_is_current():
+                entries = self._feedback_cache["entries"][:]
+            else:
+                entries = None
+        
+        if entries is not None:
+            yield from entries
+            return
+        
+        with open(self.feedback_file, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield FeedbackRecord.from_json(line)
+                except ValueError:
+                    continue
+    
+    def get_feedback_high_water(self):
+        """Sequence number that the next feedback entry will get.
+        
+        Passing an earlier value as ``start`` to iter_feedback yields only
+        the entries added since that value was read.
+        """
+        # iter_feedback numbers entries through the time index, so the high
+        # water mark must come from it too
+        with self._lock:
+            self._sync_time_index()
+            return self.time_index.entry_count(os.path.getsize(self.feedback_file), self._log_generation())
+    
+    def _sync_time_index(self):
+        """Rebuild the time index if it no longer matches the log"""
+        generation = self._log_generation()
+        if not self.time_index.is_current(os.path.getsize(self.feedback_file), generation):
+            self.time_index.rebuild(self.feedback_file, generation)
+    
+    def get_data_version(self):
+        """Token that changes whenever the feedback or the menu changes"""
+        return (self._file_signature(self.feedback_file), self._file_signature(self.menu_file))
+    
+    def get_feedback_count(self):
+        """Number of feedback entries"""
+        with self._lock:
+            if self._feedback_cache_is_current():
+                return len(self._feedback_cache["entries"])
+            count = self.feedback_columns.entry_count(os.path.getsize(self.feedback_file),
+                                                      self._log_generation())
+            if count is not None:
+                return count
+            
+            # Counts only the entries readers can parse, unlike a line count
+            self._sync_time_index()
+            return self.time_index.entry_count(os.path.getsize(self.feedback_file), self._log_generation())
+    
+    def compact_feedback(self):
+        """Rewrite the feedback log, dropping lines that are not valid JSON.
+        
+        Such lines are left by interrupted writes. Every other line is kept
+        as it is, including entries that readers skip because they cannot
+        be normalized, so compacting never loses feedback.
+        """
+        try:
+            with self._lock:
+                tmp_path = self.feedback_file + ".tmp"
+                with open(self.feedback_file, 'r') as log, open(tmp_path, 'w') as f:
+                    for line in log:
+                        if not line.strip():
+                            continue
+                        try:
+                            json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        f.write(line if line.endswith("\n") else line + "\n")
+                self._bump_log_generation()
+                os.replace(tmp_path, self.feedback_file)
+            return True
+        except Exception as e:
+            print(f"Error compacting feedback data: {e}")
+            return False
+    
+    def _sync_derived(self, store):
+        """Rebuild a derived store from the log if it no longer matches it"""
+        if not store.is_current(os.path.getsize(self.feedback_file), self._log_generation()):
+            # Loading the log may compact it, so read the generation afterwards
+            entries = self._load_feedback()
+            store.rebuild(entries, self._feedback_cache["signature"][1], self._log_generation())
+    
+    def get_rating_columns(self):
+        """Get every rating as parallel NumPy columns, one row per component rating"""
+        try:
+            with self._lock:
+                self._sync_derived(self.feedback_columns)
+                return self.feedback_columns.read()
+        except Exception as e:
+            print(f"Error loading feedback columns: {e}")
+            return None
+    
+    def get_rating_aggregates(self):
+        """Get running rating statistics per component and per (component, item)"""
+        try:
+            with self._lock:
+                self._sync_derived(self.rating_aggregates)
+                return self.rating_aggregates.snapshot()
+        except Exception as e:
+            print(f"Error loading rating aggregates: {e}")
+            return {"components": {}, "items": {}}
     
     def get_feedback_for_item(self, item_id):
         """Get feedback specific to a menu item"""
         all_feedback = self.get_all_feedback()
-        return [fb for fb in all_feedback if fb.get("item_id") == item_id]
\ No newline at end of file
+        return FeedbackTable(fb for fb in all_feedback if fb.item_id == item_id)
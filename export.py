@@ -1,89 +1,42 @@
+import argparse
 import csv
+import gzip
+import json
 import os
-from datetime import datetime
-from database import Database
-import gi
-gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, GLib
+import threading
+from datetime import datetime, timedelta
+from database import get_database
+from feedback_record import TIMESTAMP_FORMAT
+from summary import component_summary, item_component_summary
+
+# GTK is only imported by the methods that need it, so the command line
+# entry point at the end of this file runs headless (e.g. from cron).
+
+# How many rows to write between progress callbacks
+PROGRESS_INTERVAL = 5000
+
+# Remembers how far the last incremental export got
+CHECKPOINT_FILE = "data/export_checkpoint.json"
 
 class ExportData:
     def __init__(self):
-        self.db = Database()
+        self.db = get_database()
     
-    def export_to_sheets(self):
+    def export_to_sheets(self, compress=False, progress=None):
         """Export feedback data to CSV format (compatible with Google Sheets)"""
         try:
-            # Create export directory if it doesn't exist
-            export_dir = "exports"
-            if not os.path.exists(export_dir):
-                os.makedirs(export_dir)
-            
-            # Generate filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"feedback_export_{timestamp}.csv"
-            file_path = os.path.join(export_dir, filename)
-            
-            # Get all feedback data
-            feedback_data = self.db.get_all_feedback()
+            # Timestamped file in the exports directory
+            file_path = self._default_export_path(compress)
             
             # If no feedback data, return False
-            if not feedback_data:
+            if not self.write_csv(file_path, progress):
                 print("No feedback data to export")
                 return False
             
-            # Get all menu items to lookup component names
-            menu_items = self.db.get_all_menu_items()
-            
-            # Create component ID to name mapping
-            component_map = {}
-            for item in menu_items:
-                for component in item.get("components", []):
-                    component_map[component["id"]] = component["name"]
-            
-            # Prepare data for export
-            export_data = []
-            
-            # Header row
-            header = ["Timestamp", "Item ID", "Item Name"]
-            
-            # Add component names to header (collect all unique component IDs first)
-            component_ids = set()
-            for fb in feedback_data:
-                for comp_id in fb.get("ratings", {}):
-                    component_ids.add(int(comp_id))
-            
-            # Add component names to header in sorted order
-            for comp_id in sorted(component_ids):
-                if comp_id in component_map:
-                    header.append(component_map[comp_id])
-                else:
-                    header.append(f"Component {comp_id}")
-            
-            export_data.append(header)
-            
-            # Add feedback rows
-            for fb in feedback_data:
-                row = [
-                    fb.get("timestamp", ""),
-                    fb.get("item_id", ""),
-                    fb.get("item_name", "")
-                ]
-                
-                # Add ratings for each component
-                for comp_id in sorted(component_ids):
-                    rating = fb.get("ratings", {}).get(str(comp_id), "")
-                    row.append(rating)
-                
-                export_data.append(row)
-            
-            # Write to CSV
-            with open(file_path, 'w', newline='') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerows(export_data)
-            
             print(f"Feedback data exported to {file_path}")
             
             # Show notification to user using Gtk
+            from gi.repository import GLib
             GLib.idle_add(self.show_export_notification, file_path)
             
             return True
@@ -92,6 +45,141 @@ class ExportData:
             print(f"Error exporting data: {e}")
             return False
     
+    def get_export_header(self):
+        """Header row and the component IDs of the rating columns, in order"""
+        # One column per component in the menu catalog, so the columns are
+        # known without a pass over the feedback
+        component_names = {}
+        for item in self.db.get_all_menu_items():
+            for component in item.get("components", []):
+                component_names[component["id"]] = component["name"]
+        
+        # Plus components that were rated but are no longer on the menu
+        rated = self.db.get_rating_aggregates()["components"]
+        component_ids = sorted(set(component_names) | set(rated))
+        
+        header = ["Timestamp", "Item ID", "Item Name"]
+        for comp_id in component_ids:
+            header.append(component_names.get(comp_id, f"Component {comp_id}"))
+        return header, component_ids
+    
+    def iter_export_rows(self, component_ids, feedback=None):
+        """Yield one CSV row per feedback entry"""
+        if feedback is None:
+            feedback = self.db.iter_feedback()
+        for fb in feedback:
+            row = [
+                fb.timestamp.strftime(TIMESTAMP_FORMAT),
+                fb.item_id,
+                fb.item_name
+            ]
+            row.extend(fb.ratings.get(comp_id, "") for comp_id in component_ids)
+            yield row
+    
+    def write_csv(self, file_path, progress=None, since=None, until=None, start=0, stop=None):
+        """Stream feedback to a CSV file (gzip-compressed if the name ends in .gz).
+        
+        ``since``/``until`` and ``start``/``stop`` limit the export as in
+        Database.iter_feedback. ``progress`` is called as
+        ``progress(rows_written, total_rows)`` every PROGRESS_INTERVAL rows
+        and once at the end; ``total_rows`` is None while it is not known in
+        advance. Returns the number of feedback rows written; no file is
+        left behind when that is zero.
+        """
+        bounded = since is not None or until is not None or start or stop is not None
+        total = None if bounded else self.db.get_feedback_count()
+        if total == 0:
+            return 0
+        
+        header, component_ids = self.get_export_header()
+        feedback = self.db.iter_feedback(since=since, until=until, start=start, stop=stop)
+        
+        if file_path.endswith(".gz"):
+            csvfile = gzip.open(file_path, 'wt', newline='')
+        else:
+            csvfile = open(file_path, 'w', newline='')
+        
+        written = 0
+        with csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(header)
+            for row in self.iter_export_rows(component_ids, feedback):
+                writer.writerow(row)
+                written += 1
+                if progress and written % PROGRESS_INTERVAL == 0:
+                    progress(written, max(total, written) if total else None)
+        
+        if not written:
+            os.remove(file_path)
+        if progress:
+            progress(written, written)
+        return written
+    
+    def export_incremental(self, file_path=None, checkpoint_file=CHECKPOINT_FILE):
+        """Export only the feedback added since the last incremental export.
+        
+        The high-water mark of the last successful export is kept in
+        ``checkpoint_file`` and only moves forward once the new file has been
+        written completely. There is no date filter: the checkpoint moves
+        past every entry up to the high-water mark, so filtering would skip
+        entries for good.
+        """
+        try:
+            checkpoint = self.load_checkpoint(checkpoint_file)
+            start = checkpoint.get("high_water", 0)
+            stop = self.db.get_feedback_high_water()
+            
+            # The log was rebuilt (e.g. compacted) since the last export
+            if start > stop:
+                print("Export checkpoint is ahead of the feedback data; exporting everything")
+                start = 0
+            
+            if start == stop:
+                print("No new feedback to export")
+                return False
+            
+            if file_path is None:
+                file_path = self._default_export_path()
+            
+            written = self.write_csv(file_path, start=start, stop=stop)
+            self.save_checkpoint(checkpoint_file, stop)
+            if not written:
+                print("No new feedback to export")
+                return False
+            
+            print(f"Exported {written} new feedback entries to {file_path}")
+            return True
+            
+        except Exception as e:
+            print(f"Error exporting data: {e}")
+            return False
+    
+    def load_checkpoint(self, checkpoint_file=CHECKPOINT_FILE):
+        """Read the incremental export checkpoint (empty if there is none)"""
+        try:
+            with open(checkpoint_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_checkpoint(self, checkpoint_file, high_water):
+        tmp_path = checkpoint_file + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                "high_water": high_water,
+                "exported_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }, f, indent=4)
+        os.replace(tmp_path, checkpoint_file)
+    
+    def _default_export_path(self, compress=False):
+        """Timestamped file name in the exports folder"""
+        export_dir = "exports"
+        if not os.path.exists(export_dir):
+            os.makedirs(export_dir)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"feedback_export_{timestamp}.csv" + (".gz" if compress else "")
+        return os.path.join(export_dir, filename)
+    
     def show_export_notification(self, file_path):
         """Show a desktop notification about the export"""
         try:
@@ -106,72 +194,37 @@ class ExportData:
     def get_component_summary(self):
         """Get a summary of component ratings for analysis"""
         try:
-            # Get all feedback data
-            feedback_data = self.db.get_all_feedback()
+            # Running statistics are maintained as feedback is added, so this
+            # does not depend on how much feedback has been collected
+            aggregates = self.db.get_rating_aggregates()
+            comp_ids, stats = component_summary(aggregates)
             
             # If no feedback data, return empty dict
-            if not feedback_data:
+            if not comp_ids:
                 return {}
             
-            # Get all menu items
-            menu_items = self.db.get_all_menu_items()
-            
-            # Create component ID to name mapping
-            component_map = {}
-            for item in menu_items:
-                for component in item.get("components", []):
-                    component_map[component["id"]] = {
-                        "name": component["name"],
-                        "item_id": item["id"],
-                        "item_name": item["name"]
-                    }
-            
-            # Initialize summary data
             summary = {}
+            for comp_id, total, count, average in zip(comp_ids, stats["sum"], stats["count"], stats["mean"]):
+                component = self.db.get_component(comp_id)
+                comp_name = component["name"] if component else f"Component {comp_id}"
+                summary[comp_id] = {
+                    "name": comp_name,
+                    "total_rating": int(total),
+                    "count": int(count),
+                    "average": float(average) if count else 0,
+                    "item_breakdown": {}
+                }
             
-            # Process feedback
-            for fb in feedback_data:
-                item_id = fb.get("item_id")
-                item_name = fb.get("item_name", "Unknown Item")
-                
-                for comp_id_str, rating in fb.get("ratings", {}).items():
-                    comp_id = int(comp_id_str)
-                    
-                    # Initialize component data if not exists
-                    if comp_id not in summary:
-                        comp_name = component_map.get(comp_id, {}).get("name", f"Component {comp_id}")
-                        summary[comp_id] = {
-                            "name": comp_name,
-                            "total_rating": 0,
-                            "count": 0,
-                            "average": 0,
-                            "item_breakdown": {}
-                        }
-                    
-                    # Update component summary
-                    summary[comp_id]["total_rating"] += rating
-                    summary[comp_id]["count"] += 1
-                    
-                    # Update item breakdown
-                    if item_id not in summary[comp_id]["item_breakdown"]:
-                        summary[comp_id]["item_breakdown"][item_id] = {
-                            "name": item_name,
-                            "total_rating": 0,
-                            "count": 0,
-                            "average": 0
-                        }
-                    
-                    summary[comp_id]["item_breakdown"][item_id]["total_rating"] += rating
-                    summary[comp_id]["item_breakdown"][item_id]["count"] += 1
-            
-            # Calculate averages
-            for comp_id, data in summary.items():
-                if data["count"] > 0:
-                    data["average"] = data["total_rating"] / data["count"]
-                    
-                for item_id, item_data in data["item_breakdown"].items():
-                    if item_data["count"] > 0:
-                        item_data["average"] = item_data["total_rating"] / item_data["count"]
+            # Per-item breakdown for each component
+            keys, item_stats = item_component_summary(aggregates)
+            for (item_id, comp_id), total, count, average in zip(keys, item_stats["sum"], item_stats["count"], item_stats["mean"]):
+                menu_item = self.db.get_menu_item(item_id)
+                summary[comp_id]["item_breakdown"][item_id] = {
+                    "name": menu_item["name"] if menu_item else "Unknown Item",
+                    "total_rating": int(total),
+                    "count": int(count),
+                    "average": float(average) if count else 0
+                }
             
             return summary
             
@@ -181,6 +234,19 @@ class ExportData:
             
     def show_export_dialog(self, parent_window):
         """Show a file chooser dialog for export location"""
+        file_path = self.choose_export_file(parent_window)
+        if not file_path:
+            return False
+        
+        # Export to the selected file
+        return self.export_to_specific_file(file_path)
+    
+    def choose_export_file(self, parent_window):
+        """Ask the user where to save the export; returns the path or None"""
+        import gi
+        gi.require_version('Gtk', '3.0')
+        from gi.repository import Gtk
+        
         dialog = Gtk.FileChooserDialog(
             title="Export Feedback Data",
             parent=parent_window,
@@ -190,6 +256,7 @@ class ExportData:
             Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL,
             Gtk.STOCK_SAVE, Gtk.ResponseType.OK
         )
+        dialog.set_do_overwrite_confirmation(True)
         
         # Set suggested filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -202,46 +269,94 @@ class ExportData:
         filter_csv.add_pattern("*.csv")
         dialog.add_filter(filter_csv)
         
+        filter_gz = Gtk.FileFilter()
+        filter_gz.set_name("Compressed CSV files")
+        filter_gz.add_pattern("*.csv.gz")
+        dialog.add_filter(filter_gz)
+        
         filter_any = Gtk.FileFilter()
         filter_any.set_name("All files")
         filter_any.add_pattern("*")
         dialog.add_filter(filter_any)
         
         response = dialog.run()
-        
-        if response == Gtk.ResponseType.OK:
-            file_path = dialog.get_filename()
-            dialog.destroy()
-            
-            # Export to the selected file
-            success = self.export_to_specific_file(file_path)
-            return success
-        else:
-            dialog.destroy()
-            return False
+        file_path = dialog.get_filename() if response == Gtk.ResponseType.OK else None
+        dialog.destroy()
+        return file_path
     
-    def export_to_specific_file(self, file_path):
+    def export_to_specific_file(self, file_path, progress=None):
         """Export feedback data to a specific file path"""
         try:
             # Make sure directory exists
             directory = os.path.dirname(file_path)
-            if not os.path.exists(directory):
+            if directory and not os.path.exists(directory):
                 os.makedirs(directory)
             
-            # Get all feedback data
-            feedback_data = self.db.get_all_feedback()
-            
             # If no feedback data, return False
-            if not feedback_data:
+            if not self.write_csv(file_path, progress):
                 print("No feedback data to export")
                 return False
             
-            # Rest of export code (similar to export_to_sheets)
-            # ...
-            
-            # For simplicity, we'll just call export_to_sheets here
-            return self.export_to_sheets()
+            print(f"Feedback data exported to {file_path}")
+            return True
             
         except Exception as e:
             print(f"Error exporting to specific file: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    def export_in_background(self, file_path, on_progress=None, on_done=None):
+        """Export to a file on a worker thread.
+        
+        ``on_progress(rows_written, total_rows)`` and ``on_done(success, file_path)``
+        are called on the GTK main loop through GLib.idle_add, so they can
+        update widgets directly.
+        """
+        from gi.repository import GLib
+        
+        def report_progress(written, total):
+            if on_progress:
+                GLib.idle_add(_call_once, on_progress, written, total)
+        
+        def run():
+            success = self.export_to_specific_file(file_path, report_progress)
+            if on_done:
+                GLib.idle_add(_call_once, on_done, success, file_path)
+        
+        thread = threading.Thread(target=run, name="feedback-export", daemon=True)
+        thread.start()
+        return thread
+
+def _call_once(callback, *args):
+    """Run a GLib.idle_add callback a single time"""
+    callback(*args)
+    return False
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export cafeteria feedback to CSV")
+    parser.add_argument("--output", help="file to write (default: a timestamped file in exports/)")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the default output file")
+    parser.add_argument("--since", type=parse_date, help="first date to export (YYYY-MM-DD)")
+    parser.add_argument("--until", type=parse_date, help="last date to export, inclusive (YYYY-MM-DD)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only export feedback added since the last incremental export")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE,
+                        help="checkpoint file used by --incremental")
+    args = parser.parse_args()
+    if args.incremental and (args.since or args.until):
+        parser.error("--since/--until cannot be combined with --incremental")
+    
+    exporter = ExportData()
+    output = args.output or exporter._default_export_path(args.gzip)
+    # --until is inclusive; the database treats the upper bound as exclusive
+    until = args.until + timedelta(days=1) if args.until else None
+    
+    if args.incremental:
+        success = exporter.export_incremental(output, args.checkpoint)
+    else:
+        written = exporter.write_csv(output, since=args.since, until=until)
+        success = bool(written)
+        print(f"Exported {written} feedback entries to {output}" if written else "No feedback data to export")
+    raise SystemExit(0 if success else 1)
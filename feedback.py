@@ -1,13 +1,14 @@
 import gi
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, GdkPixbuf, GLib
+from gi.repository import Gtk, GLib
 import os
-from database import Database
+from database import get_database
+from image_cache import get_pixbuf_cache
 
 class FeedbackSystem:
     def __init__(self, parent):
         self.parent = parent
-        self.db = Database()
+        self.db = get_database()
         self.selected_item_id = None
         self.component_ratings = {}
         self.create_feedback_ui()
@@ -57,6 +58,12 @@ class FeedbackSystem:
         self.components_box.set_margin_bottom(10)
         self.components_frame.add(self.components_box)
         
+        # Rating rows are created on demand and reused for every dish
+        self.rating_rows = []
+        self.no_components_label = Gtk.Label(label="No components found for this item")
+        self.no_components_label.set_no_show_all(True)
+        self.components_box.pack_start(self.no_components_label, False, False, 0)
+        
         # Submit button container
         button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=0)
         button_box.set_halign(Gtk.Align.END)
@@ -91,7 +98,7 @@ class FeedbackSystem:
         for img_file in image_files:
             try:
                 img_path = os.path.join("images", img_file)
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(img_path, 30, 30)
+                pixbuf = get_pixbuf_cache().load(img_path, 30, 30)
                 self.rating_images.append(pixbuf)
             except GLib.Error as e:
                 print(f"Error loading image {img_file}: {e}")
@@ -127,9 +134,10 @@ class FeedbackSystem:
                     print(f"Error creating default image {filename}: {e}")
     
     def on_item_selected(self, combo):
-        # Clear previous components
-        for child in self.components_box.get_children():
-            self.components_box.remove(child)
+        # Hide the previous dish's rating rows; they are reused below
+        for row in self.rating_rows:
+            row.hide()
+        self.no_components_label.hide()
             
         # Clear previous ratings
         self.component_ratings = {}
@@ -155,58 +163,30 @@ class FeedbackSystem:
         components = selected_item.get("components", [])
         
         if not components:
-            label = Gtk.Label(label="No components found for this item")
-            self.components_box.pack_start(label, False, False, 0)
+            self.no_components_label.show()
             self.submit_button.set_sensitive(False)
-            self.components_box.show_all()
             return
             
         # Enable submit button
         self.submit_button.set_sensitive(True)
         
+        # Create more rows only when this dish has more components than any
+        # dish shown before
+        while len(self.rating_rows) < len(components):
+            row = ComponentRatingRow(self.rating_images, self.on_rating_clicked)
+            self.components_box.pack_start(row, False, False, 5)
+            row.show_all()
+            self.rating_rows.append(row)
+        
         # Display components for rating
-        for component in components:
+        for row, component in zip(self.rating_rows, components):
             comp_id = component["id"]
-            comp_name = component["name"]
-            
-            # Component container
-            comp_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
-            self.components_box.pack_start(comp_box, False, False, 5)
-            
-            # Component name
-            name_label = Gtk.Label(label=f"{comp_name}:")
-            name_label.set_size_request(100, -1)
-            name_label.set_halign(Gtk.Align.START)
-            comp_box.pack_start(name_label, False, False, 0)
-            
-            # Rating buttons container
-            rating_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=5)
-            comp_box.pack_start(rating_box, False, False, 0)
+            row.set_component(component)
+            row.show()
             
             # Store the selected rating
             self.component_ratings[comp_id] = 0
-            
-            # Create rating buttons (smileys)
-            rating_buttons = []
-            for rating in range(1, 6):
-                button = Gtk.Button()
-                if self.rating_images[rating-1]:
-                    image = Gtk.Image.new_from_pixbuf(self.rating_images[rating-1])
-                    button.set_image(image)
-                else:
-                    button.set_label(str(rating))
-                
-                # Connect button click
-                button.connect("clicked", self.on_rating_clicked, comp_id, rating)
-                rating_box.pack_start(button, False, False, 0)
-                rating_buttons.append(button)
-            
-            # Rating label
-            self.component_ratings[f"{comp_id}_label"] = Gtk.Label(label="Not rated")
-            self.component_ratings[f"{comp_id}_label"].set_size_request(100, -1)
-            comp_box.pack_start(self.component_ratings[f"{comp_id}_label"], False, False, 0)
-        
-        self.components_box.show_all()
+            self.component_ratings[f"{comp_id}_label"] = row.status_label
     
     def on_rating_clicked(self, button, comp_id, rating):
         """Handle rating button click"""
@@ -270,10 +250,8 @@ class FeedbackSystem:
             dialog.run()
             dialog.destroy()
             
-            # Reset form
+            # Reset form (clearing the selection hides the rating rows)
             self.item_combo.set_active(-1)
-            for child in self.components_box.get_children():
-                self.components_box.remove(child)
             self.component_ratings = {}
             self.submit_button.set_sensitive(False)
         else:
@@ -303,10 +281,12 @@ class FeedbackSystem:
         title.get_style_context().add_class("sub-header")
         box.pack_start(title, False, False, 5)
         
-        # Get all feedback data
-        feedback_data = self.db.get_all_feedback()
+        # Get per-component rating averages for every dish with feedback.
+        # Imported here so NumPy is only loaded when the summary is opened
+        from summary import item_component_averages
+        item_averages = item_component_averages(self.db.get_rating_aggregates())
         
-        if not feedback_data:
+        if not item_averages:
             label = Gtk.Label(label="No feedback data available.")
             label.set_margin_top(20)
             box.pack_start(label, False, False, 0)
@@ -317,52 +297,27 @@ class FeedbackSystem:
         notebook = Gtk.Notebook()
         box.pack_start(notebook, True, True, 10)
         
-        # Group feedback by item
-        item_feedback = {}
-        for fb in feedback_data:
-            item_id = fb.get("item_id")
-            if item_id not in item_feedback:
-                item_feedback[item_id] = []
-            item_feedback[item_id].append(fb)
-        
         # Create a tab for each item
-        for item_id, feedback_list in item_feedback.items():
-            # Get item name from first feedback entry
-            item_name = feedback_list[0].get("item_name", f"Item {item_id}")
+        for item_id, averages in item_averages.items():
+            # Get menu item to know the components
+            menu_item = self.db.get_menu_item(item_id)
+            if not menu_item:
+                continue
+            item_name = menu_item.get("name", f"Item {item_id}")
             
             # Create tab content
             tab_content = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
             tab_content.set_border_width(10)
             
-            # Get menu item to know the components
-            menu_item = self.db.get_menu_item(item_id)
-            if not menu_item:
-                continue
-                
-            # Calculate average ratings for each component
+            # Collect average ratings for each component in menu order
             component_ratings = {}
             for component in menu_item.get("components", []):
                 comp_id = component["id"]
-                comp_name = component["name"]
-                
-                # Initialize count and sum for averaging
-                count = 0
-                total = 0
-                
-                # Sum ratings from all feedback
-                for fb in feedback_list:
-                    rating = fb.get("ratings", {}).get(str(comp_id))
-                    if rating:
-                        count += 1
-                        total += rating
-                
-                # Calculate average if there are ratings
-                if count > 0:
-                    avg_rating = total / count
+                if comp_id in averages:
                     component_ratings[comp_id] = {
-                        "name": comp_name,
-                        "average": avg_rating,
-                        "count": count
+                        "name": component["name"],
+                        "average": averages[comp_id]["average"],
+                        "count": averages[comp_id]["count"]
                     }
             
             # Display component ratings
@@ -405,4 +360,45 @@ class FeedbackSystem:
             tab_label = Gtk.Label(label=item_name)
             notebook.append_page(tab_content, tab_label)
         
-        parent_window.show_all()
\ No newline at end of file
+        parent_window.show_all()
+
+class ComponentRatingRow(Gtk.Box):
+    """Name, smiley buttons and status label for rating one component"""
+    def __init__(self, rating_images, on_rating_clicked):
+        Gtk.Box.__init__(self, orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        self.comp_id = None
+        
+        # Component name
+        self.name_label = Gtk.Label()
+        self.name_label.set_size_request(100, -1)
+        self.name_label.set_halign(Gtk.Align.START)
+        self.pack_start(self.name_label, False, False, 0)
+        
+        # Rating buttons container
+        rating_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=5)
+        self.pack_start(rating_box, False, False, 0)
+        
+        # Create rating buttons (smileys)
+        for rating in range(1, 6):
+            button = Gtk.Button()
+            if rating_images[rating-1]:
+                image = Gtk.Image.new_from_pixbuf(rating_images[rating-1])
+                button.set_image(image)
+            else:
+                button.set_label(str(rating))
+            
+            # The row is reused, so look up the component when clicked
+            button.connect("clicked", lambda button, rating=rating:
+                           on_rating_clicked(button, self.comp_id, rating))
+            rating_box.pack_start(button, False, False, 0)
+        
+        # Rating label
+        self.status_label = Gtk.Label(label="Not rated")
+        self.status_label.set_size_request(100, -1)
+        self.pack_start(self.status_label, False, False, 0)
+    
+    def set_component(self, component):
+        """Show a component, with no rating selected yet"""
+        self.comp_id = component["id"]
+        self.name_label.set_label(f"{component['name']}:")
+        self.status_label.set_label("Not rated")
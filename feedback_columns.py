@@ -0,0 +1,121 @@
+import calendar
+import json
+import os
+from array import array
+
+# Column name -> (array typecode used when appending, NumPy dtype used when reading)
+COLUMNS = {
+    "feedback_id": ("i", "int32"),
+    "timestamp": ("q", "int64"),
+    "item_id": ("i", "int32"),
+    "component_id": ("i", "int32"),
+    "rating": ("b", "int8"),
+}
+
+class FeedbackColumnStore:
+    """Columnar snapshot of the feedback log for analytics.
+
+    Every rating is one row spread over fixed-width binary files (one per
+    column), so new feedback is appended without touching existing data and
+    the whole history can be opened with np.memmap instead of parsed.
+    Timestamps are seconds since the epoch, taken as wall-clock time.
+
+    meta.json records how many log entries and bytes of the log the
+    snapshot covers, and the log's generation (bumped whenever the log is
+    rewritten); when that no longer matches the log the snapshot is
+    rebuilt from scratch.
+    """
+
+    def __init__(self, directory="data/feedback_columns"):
+        self.directory = directory
+        self.meta_file = os.path.join(directory, "meta.json")
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def _column_path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, entries, log_size, generation):
+        tmp_path = self.meta_file + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"entries": entries, "log_size": log_size, "generation": generation}, f)
+        os.replace(tmp_path, self.meta_file)
+
+    def _covers(self, meta, log_size, generation):
+        return (meta is not None and meta["log_size"] == log_size and
+                meta.get("generation") == generation)
+
+    def is_current(self, log_size, generation):
+        """Check whether the snapshot covers the log of the given size and generation"""
+        return self._covers(self._read_meta(), log_size, generation)
+
+    def entry_count(self, log_size, generation):
+        """Number of feedback entries covered, or None if the snapshot is stale"""
+        meta = self._read_meta()
+        if not self._covers(meta, log_size, generation):
+            return None
+        return meta["entries"]
+
+    def _encode(self, entries, first_id):
+        """Convert FeedbackRecords into per-column arrays"""
+        data = {name: array(typecode) for name, (typecode, _) in COLUMNS.items()}
+        for feedback_id, fb in enumerate(entries, first_id):
+            seconds = calendar.timegm(fb.timestamp.timetuple())
+            for comp_id, rating in fb.ratings.items():
+                data["feedback_id"].append(feedback_id)
+                data["timestamp"].append(seconds)
+                data["item_id"].append(fb.item_id)
+                data["component_id"].append(comp_id)
+                data["rating"].append(rating)
+        return data
+
+    def append(self, record, log_size_before, log_size_after, generation):
+        """Add one feedback entry that was just appended to the log.
+
+        Does nothing if the snapshot was already out of date; it is then
+        rebuilt on the next read.
+        """
+        meta = self._read_meta()
+        if not self._covers(meta, log_size_before, generation):
+            return False
+
+        data = self._encode([record], meta["entries"])
+        for name, values in data.items():
+            with open(self._column_path(name), 'ab') as f:
+                values.tofile(f)
+        self._write_meta(meta["entries"] + 1, log_size_after, generation)
+        return True
+
+    def rebuild(self, entries, log_size, generation):
+        """Rewrite the whole snapshot from the given FeedbackRecords"""
+        data = self._encode(entries, 0)
+        for name, values in data.items():
+            tmp_path = self._column_path(name) + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                values.tofile(f)
+            os.replace(tmp_path, self._column_path(name))
+        self._write_meta(len(entries), log_size, generation)
+
+    def read(self):
+        """Open every column as a read-only NumPy array"""
+        import numpy as np
+
+        columns = {}
+        for name, (_, dtype) in COLUMNS.items():
+            path = self._column_path(name)
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                columns[name] = np.memmap(path, dtype=dtype, mode='r')
+            else:
+                columns[name] = np.empty(0, dtype=dtype)
+
+        # An interrupted append can leave columns of different lengths;
+        # only rows present in every column are valid
+        rows = min(len(values) for values in columns.values())
+        return {name: values[:rows] for name, values in columns.items()}
@@ -0,0 +1,170 @@
+import calendar
+import json
+import mmap
+import os
+import struct
+from array import array
+from datetime import date, datetime
+from feedback_record import FeedbackRecord
+
+# One record per log entry: timestamp (seconds since the epoch, wall-clock
+# time) and the byte offset where the entry starts in the feedback log
+RECORD = struct.Struct("=qq")
+
+def to_datetime(value):
+    """Convert a datetime, date or "YYYY-MM-DD[ HH:MM:SS]" string to a datetime"""
+    if isinstance(value, str):
+        fmt = "%Y-%m-%d %H:%M:%S" if " " in value else "%Y-%m-%d"
+        return datetime.strptime(value, fmt)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+def to_epoch_seconds(value):
+    """Convert a datetime, date or "YYYY-MM-DD[ HH:MM:SS]" string to index time"""
+    return calendar.timegm(to_datetime(value).timetuple())
+
+class FeedbackTimeIndex:
+    """Time index over the append-only feedback log.
+
+    Entries are normally appended in time order, so a binary search over
+    the index finds the first entry of a date range, and its byte offset
+    lets readers seek straight to it. Entries are addressed by their
+    sequence number (position in the log). Like FeedbackColumnStore, the
+    index records the log size it covers and is rebuilt when that no
+    longer matches.
+
+    Timestamps are local wall-clock time, so they can go backwards (the
+    hour repeated when daylight saving time ends, clock corrections, old
+    logs). The index records whether it is still in time order and scans
+    it linearly when it is not.
+    """
+
+    def __init__(self, path="data/feedback_index.bin"):
+        self.path = path
+        self.meta_file = os.path.splitext(path)[0] + ".json"
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, entries, log_size, generation, in_order, last):
+        tmp_path = self.meta_file + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"entries": entries, "log_size": log_size, "generation": generation,
+                       "sorted": in_order, "last": last}, f)
+        os.replace(tmp_path, self.meta_file)
+
+    def _covers(self, meta, log_size, generation):
+        # Indexes written before the order was recorded are rebuilt
+        return (meta is not None and meta["log_size"] == log_size and
+                meta.get("generation") == generation and "sorted" in meta)
+
+    def is_current(self, log_size, generation):
+        """Check whether the index covers the log of the given size and generation"""
+        return self._covers(self._read_meta(), log_size, generation)
+
+    def entry_count(self, log_size, generation):
+        """Number of indexed entries, or None if the index is stale"""
+        meta = self._read_meta()
+        if not self._covers(meta, log_size, generation):
+            return None
+        return meta["entries"]
+
+    def append(self, timestamp, offset, log_size_before, log_size_after, generation):
+        """Index one entry that was just appended to the log"""
+        meta = self._read_meta()
+        if not self._covers(meta, log_size_before, generation):
+            return False
+
+        seconds = to_epoch_seconds(timestamp)
+        in_order = meta["sorted"] and (meta["last"] is None or seconds >= meta["last"])
+        with open(self.path, 'ab') as f:
+            f.write(RECORD.pack(seconds, offset))
+        self._write_meta(meta["entries"] + 1, log_size_after, generation, in_order, seconds)
+        return True
+
+    def rebuild(self, log_path, generation):
+        """Re-index the whole feedback log"""
+        records = array('q')
+        offset = 0
+        in_order = True
+        last = None
+        with open(log_path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    # Index exactly the entries that readers can parse
+                    try:
+                        seconds = to_epoch_seconds(FeedbackRecord.from_json(line).timestamp)
+                    except ValueError:
+                        seconds = None
+                    if seconds is not None:
+                        records.extend((seconds, offset))
+                        if last is not None and seconds < last:
+                            in_order = False
+                        last = seconds
+                offset += len(line)
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            records.tofile(f)
+        os.replace(tmp_path, self.path)
+        self._write_meta(len(records) // 2, offset, generation, in_order, last)
+
+    def lookup(self, since=None, until=None, start=0, stop=None):
+        """Find the entries in [since, until) between sequence numbers start and stop.
+
+        Returns ``(first, last, offset)``: a sequence range holding every
+        matching entry and the byte offset of the first one (None if nothing
+        matches). When the index is not in time order the range can also
+        hold entries outside [since, until), which the caller must skip.
+        """
+        meta = self._read_meta()
+        entries = meta["entries"] if meta else 0
+        in_order = meta.get("sorted", True) if meta else True
+        stop = entries if stop is None else min(stop, entries)
+        if start >= stop:
+            return start, start, None
+
+        with open(self.path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as index:
+            def record(position):
+                return RECORD.unpack_from(index, position * RECORD.size)
+
+            def first_at_or_after(seconds, lo, hi):
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if record(mid)[0] < seconds:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                return lo
+
+            def matching_range(low, high):
+                first = None
+                last = start
+                for position in range(start, stop):
+                    seconds = record(position)[0]
+                    if (low is None or seconds >= low) and (high is None or seconds < high):
+                        if first is None:
+                            first = position
+                        last = position + 1
+                return (start if first is None else first), last
+
+            first = start
+            last = stop
+            if not in_order:
+                first, last = matching_range(None if since is None else to_epoch_seconds(since),
+                                             None if until is None else to_epoch_seconds(until))
+            else:
+                if since is not None:
+                    first = first_at_or_after(to_epoch_seconds(since), start, stop)
+                if until is not None:
+                    last = first_at_or_after(to_epoch_seconds(until), first, stop)
+
+            if first >= last:
+                return first, first, None
+            return first, last, record(first)[1]
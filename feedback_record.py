@@ -0,0 +1,89 @@
+import json
+from datetime import datetime
+from rating_aggregates import MAX_RATING, MIN_RATING
+
+# Format of feedback timestamps in the log, exports and the SQLite database
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# IDs and ratings must fit the fixed-width columns they are kept in by
+# FeedbackTable and FeedbackColumnStore (int32 and int8)
+ID_RANGE = (-2**31, 2**31 - 1)
+STORED_RATING_RANGE = (-2**7, 2**7 - 1)
+
+def _bounded(value, limits, what):
+    value = int(value)
+    if not limits[0] <= value <= limits[1]:
+        raise ValueError(f"{what} {value} is out of range")
+    return value
+
+class FeedbackRecord:
+    """One feedback submission with normalized types.
+
+    ``item_id`` and the keys and values of ``ratings`` (component ID ->
+    rating) are ints and ``timestamp`` is a datetime, so readers never have
+    to convert them. Both storage engines return feedback as records.
+    """
+    __slots__ = ("item_id", "item_name", "ratings", "timestamp")
+
+    def __init__(self, item_id, item_name, ratings, timestamp):
+        self.item_id = item_id
+        self.item_name = item_name
+        self.ratings = ratings
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_dict(cls, data, timestamp=None):
+        """Normalize a feedback dict, as built by the UI or stored in the log.
+
+        ``timestamp``, if given, replaces the one in the dict; new
+        submissions are stamped with the time they are stored. Ratings
+        stored as null mean the component was not rated and are left out.
+        Raises ValueError if a field is missing, has the wrong type or does
+        not fit the stored columns.
+        """
+        try:
+            value = data["timestamp"] if timestamp is None else timestamp
+            if isinstance(value, str):
+                value = datetime.strptime(value, TIMESTAMP_FORMAT)
+            elif not isinstance(value, datetime):
+                raise ValueError(f"invalid timestamp {value!r}")
+            elif value.tzinfo is not None:
+                # Stored timestamps are local wall-clock time without an offset
+                raise ValueError(f"timestamp {value!r} has a time zone")
+            return cls(
+                _bounded(data["item_id"], ID_RANGE, "Item ID"),
+                data.get("item_name", ""),
+                {_bounded(comp_id, ID_RANGE, "Component ID"):
+                     _bounded(rating, STORED_RATING_RANGE, "Rating")
+                 for comp_id, rating in data.get("ratings", {}).items() if rating is not None},
+                value.replace(microsecond=0)
+            )
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Malformed feedback entry: {e!r}")
+
+    @classmethod
+    def from_json(cls, line):
+        """Parse one line of the feedback log"""
+        return cls.from_dict(json.loads(line))
+
+    def validate(self):
+        """Check a new submission before it is stored; raises ValueError"""
+        if not self.ratings:
+            raise ValueError("Feedback has no ratings")
+        for comp_id, rating in self.ratings.items():
+            if not MIN_RATING <= rating <= MAX_RATING:
+                raise ValueError(f"Rating {rating} for component {comp_id} is not between "
+                                 f"{MIN_RATING} and {MAX_RATING}")
+
+    def to_dict(self):
+        """JSON-compatible form, as written to the feedback log"""
+        return {
+            "item_id": self.item_id,
+            "item_name": self.item_name,
+            "ratings": {str(comp_id): rating for comp_id, rating in self.ratings.items()},
+            "timestamp": self.timestamp.strftime(TIMESTAMP_FORMAT)
+        }
+
+    def __repr__(self):
+        return (f"FeedbackRecord(item_id={self.item_id!r}, item_name={self.item_name!r}, "
+                f"ratings={self.ratings!r}, timestamp={self.timestamp!r})")
@@ -0,0 +1,143 @@
+from array import array
+from datetime import datetime, timedelta
+from feedback_record import FeedbackRecord
+
+# Timestamps are stored as seconds since this instant, taken as wall-clock
+# time like in FeedbackColumnStore
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+
+class FeedbackTable:
+    """Feedback entries held as parallel arrays instead of one object each.
+
+    A FeedbackRecord, with its ratings dict, datetime and name string, takes
+    several hundred bytes; here an entry takes 24 bytes plus 5 per rating.
+    Item names are stored once per distinct name, and the ratings of entry
+    ``i`` are ``component_ids``/``ratings`` from ``rating_ends[i - 1]`` to
+    ``rating_ends[i]``.
+
+    Iterating or indexing builds FeedbackRecords on demand and slicing
+    returns a new table, so code written for a list of records keeps
+    working; rating_columns() hands every rating to NumPy without building
+    any per-entry objects.
+    """
+
+    def __init__(self, records=()):
+        self.timestamps = array('q')
+        self.item_ids = array('i')
+        self.name_ids = array('i')
+        self.rating_ends = array('q')
+        self.component_ids = array('i')
+        self.ratings = array('b')
+        self.names = []
+        self._name_index = {}
+        for record in records:
+            self.append(record)
+
+    def add_entry(self, timestamp, item_id, item_name):
+        """Start a new entry without ratings; see add_rating"""
+        name_id = self._name_index.get(item_name)
+        if name_id is None:
+            name_id = self._name_index[item_name] = len(self.names)
+            self.names.append(item_name)
+        self.timestamps.append((timestamp - EPOCH) // SECOND)
+        self.item_ids.append(item_id)
+        self.name_ids.append(name_id)
+        self.rating_ends.append(len(self.ratings))
+
+    def add_rating(self, component_id, rating):
+        """Add a rating to the last entry"""
+        self.component_ids.append(component_id)
+        self.ratings.append(rating)
+        self.rating_ends[-1] = len(self.ratings)
+
+    def append(self, record):
+        """Add a FeedbackRecord.
+
+        Raises ValueError, leaving the table unchanged, if a value does not
+        fit its column.
+        """
+        entries = len(self)
+        try:
+            self.add_entry(record.timestamp, record.item_id, record.item_name)
+            self.component_ids.extend(record.ratings.keys())
+            self.ratings.extend(record.ratings.values())
+        except (OverflowError, TypeError) as e:
+            self._truncate(entries)
+            raise ValueError(f"Cannot store feedback entry: {e!r}")
+        self.rating_ends[-1] = len(self.ratings)
+
+    def _truncate(self, entries):
+        """Drop every entry after the first ``entries``"""
+        first = self.rating_ends[entries - 1] if entries else 0
+        for column in (self.timestamps, self.item_ids, self.name_ids, self.rating_ends):
+            del column[entries:]
+        del self.component_ids[first:]
+        del self.ratings[first:]
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    def _record(self, index):
+        start = self.rating_ends[index - 1] if index else 0
+        end = self.rating_ends[index]
+        return FeedbackRecord(
+            self.item_ids[index],
+            self.names[self.name_ids[index]],
+            dict(zip(self.component_ids[start:end], self.ratings[start:end])),
+            EPOCH + self.timestamps[index] * SECOND
+        )
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return FeedbackTable(self._record(i) for i in range(start, stop, step))
+            return self._slice(start, max(start, stop))
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("feedback index out of range")
+        return self._record(index)
+
+    def _slice(self, start, stop):
+        """New table holding a copy of entries start to stop"""
+        table = FeedbackTable()
+        first = self.rating_ends[start - 1] if start else 0
+        last = self.rating_ends[stop - 1] if stop > start else first
+        table.timestamps = self.timestamps[start:stop]
+        table.item_ids = self.item_ids[start:stop]
+        table.name_ids = self.name_ids[start:stop]
+        table.rating_ends = array('q', (end - first for end in self.rating_ends[start:stop]))
+        table.component_ids = self.component_ids[first:last]
+        table.ratings = self.ratings[first:last]
+        table.names = self.names[:]
+        table._name_index = dict(self._name_index)
+        return table
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._record(index)
+
+    def item_names(self):
+        """Item ID -> name, as most recently stored in the feedback"""
+        return {item_id: self.names[name_id]
+                for item_id, name_id in dict(zip(self.item_ids, self.name_ids)).items()}
+
+    def rating_columns(self):
+        """Every rating as parallel NumPy columns, like Database.get_rating_columns.
+
+        ``feedback_id`` is the position of the entry in this table.
+        """
+        import numpy as np
+        # np.array copies, so the arrays can still grow afterwards
+        ends = np.array(self.rating_ends, dtype=np.int64)
+        counts = np.diff(ends, prepend=0)
+        return {
+            "feedback_id": np.repeat(np.arange(len(self), dtype=np.int32), counts),
+            "timestamp": np.repeat(np.array(self.timestamps, dtype=np.int64), counts),
+            "item_id": np.repeat(np.array(self.item_ids, dtype=np.int32), counts),
+            "component_id": np.array(self.component_ids, dtype=np.int32),
+            "rating": np.array(self.ratings, dtype=np.int8),
+        }
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+class FigureCache:
+    """Rendered analytics plots, reused until the feedback data changes.
+
+    Entries are keyed by the plot name, the database's data version and the
+    plot parameters (date range, DPI...), so new feedback or a menu edit
+    simply produces new keys. Figures for the analysis dialog are kept in a
+    small in-memory LRU; PNGs written for reports are kept on disk, so
+    exporting an unchanged report only copies files.
+    """
+
+    def __init__(self, max_figures=16, directory="cache/figures", max_pngs=64):
+        self.max_figures = max_figures
+        self.directory = directory
+        self.max_pngs = max_pngs
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, name, version, **params):
+        """Cache key for one plot of one version of the data"""
+        text = repr((name, version, sorted(params.items())))
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def get_figure(self, key):
+        """Get a previously rendered Figure, or None"""
+        with self._lock:
+            fig = self._figures.get(key)
+            if fig is not None:
+                self._figures.move_to_end(key)
+            return fig
+
+    def put_figure(self, key, fig):
+        with self._lock:
+            self._figures[key] = fig
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_figures:
+                self._figures.popitem(last=False)
+
+    def png_path(self, key):
+        return os.path.join(self.directory, f"{key}.png")
+
+    def copy_png(self, key, destination):
+        """Copy a cached PNG to ``destination``; returns False if there is none"""
+        try:
+            shutil.copyfile(self.png_path(key), destination)
+            return True
+        except OSError:
+            return False
+
+    def store_png(self, key, source):
+        """Keep a copy of a freshly rendered PNG"""
+        try:
+            if not os.path.exists(self.directory):
+                os.makedirs(self.directory)
+            # Copy under a temporary name so a half-written PNG is never picked up
+            tmp_path = self.png_path(key) + ".tmp"
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, self.png_path(key))
+            self._prune_pngs()
+        except OSError as e:
+            print(f"Error caching plot {source}: {e}")
+
+    def _prune_pngs(self):
+        # PNGs of older data versions are never used again; keep the newest
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                 if name.endswith(".png")]
+        if len(paths) <= self.max_pngs:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:-self.max_pngs]:
+            os.remove(path)
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def get_figure_cache():
+    """Get the plot cache shared by every part of the application"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = FigureCache()
+        return _shared_cache
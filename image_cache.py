@@ -0,0 +1,138 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import gi
+gi.require_version('GdkPixbuf', '2.0')
+from gi.repository import GdkPixbuf, GLib
+
+class PixbufCache:
+    """Bounded LRU cache of decoded, scaled images.
+
+    Entries are keyed by (path, size, mtime), so replacing an image file is
+    picked up automatically. Scaled copies are also written to an on-disk
+    thumbnail folder, so a full-size photo is only decoded and downscaled
+    once, even across restarts. The folder keeps the ``max_thumbnails``
+    most recently used thumbnails.
+    """
+
+    def __init__(self, max_entries=128, thumbnail_dir="cache/thumbnails", workers=2,
+                 max_thumbnails=512):
+        self.max_entries = max_entries
+        self.thumbnail_dir = thumbnail_dir
+        self.max_thumbnails = max_thumbnails
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-loader")
+
+    def _thumbnail_path(self, path, width, height, mtime):
+        digest = hashlib.sha1(f"{os.path.abspath(path)}:{mtime}".encode("utf-8")).hexdigest()
+        return os.path.join(self.thumbnail_dir, f"{digest}_{width}x{height}.png")
+
+    def load(self, path, width, height):
+        """Get the image at ``path`` scaled to fit width x height.
+
+        Raises GLib.Error like GdkPixbuf.Pixbuf.new_from_file_at_size.
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            # Let GdkPixbuf report the missing file the way callers expect
+            return GdkPixbuf.Pixbuf.new_from_file_at_size(path, width, height)
+        key = (path, width, height, mtime)
+
+        with self._lock:
+            pixbuf = self._entries.get(key)
+            if pixbuf is not None:
+                self._entries.move_to_end(key)
+                return pixbuf
+
+        pixbuf = self._load_uncached(path, width, height, mtime)
+
+        with self._lock:
+            self._entries[key] = pixbuf
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return pixbuf
+
+    def peek(self, path, width, height):
+        """Get the image only if it is already decoded in memory, else None"""
+        try:
+            key = (path, width, height, os.stat(path).st_mtime_ns)
+        except OSError:
+            return None
+        with self._lock:
+            pixbuf = self._entries.get(key)
+            if pixbuf is not None:
+                self._entries.move_to_end(key)
+            return pixbuf
+    
+    def load_async(self, path, width, height, callback):
+        """Load an image on a worker thread.
+        
+        ``callback(pixbuf, error)`` is called on the GTK main loop with either
+        the pixbuf or the GLib.Error. Returns a Future; cancelling it skips
+        the load if it has not started yet.
+        """
+        def work():
+            try:
+                pixbuf, error = self.load(path, width, height), None
+            except GLib.Error as e:
+                pixbuf, error = None, e
+            GLib.idle_add(_deliver, callback, pixbuf, error)
+        
+        return self._executor.submit(work)
+
+    def _load_uncached(self, path, width, height, mtime):
+        thumbnail = self._thumbnail_path(path, width, height, mtime)
+        if os.path.exists(thumbnail):
+            try:
+                pixbuf = GdkPixbuf.Pixbuf.new_from_file(thumbnail)
+                # Mark it as recently used, so pruning keeps it
+                os.utime(thumbnail)
+                return pixbuf
+            except (GLib.Error, OSError) as e:
+                print(f"Error loading thumbnail {thumbnail}: {e}")
+
+        pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(path, width, height)
+        try:
+            if not os.path.exists(self.thumbnail_dir):
+                os.makedirs(self.thumbnail_dir)
+            # Write under a temporary name so a half-written thumbnail is never picked up
+            tmp_path = thumbnail + ".tmp"
+            pixbuf.savev(tmp_path, "png", [], [])
+            os.replace(tmp_path, thumbnail)
+            # Both loader threads can get here at once
+            with self._lock:
+                self._prune_thumbnails()
+        except (GLib.Error, OSError) as e:
+            print(f"Error saving thumbnail {thumbnail}: {e}")
+        return pixbuf
+
+    def _prune_thumbnails(self):
+        # Thumbnails of replaced images or old sizes are never used again;
+        # keep the most recently used ones
+        paths = [os.path.join(self.thumbnail_dir, name) for name in os.listdir(self.thumbnail_dir)
+                 if name.endswith(".png")]
+        if len(paths) <= self.max_thumbnails:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:-self.max_thumbnails]:
+            os.remove(path)
+
+def _deliver(callback, pixbuf, error):
+    callback(pixbuf, error)
+    return False  # to stop the idle_add
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def get_pixbuf_cache():
+    """Get the image cache shared by every part of the application"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = PixbufCache()
+        return _shared_cache
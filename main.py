@@ -1,11 +1,39 @@
-import gi
-gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, GdkPixbuf, Gdk
+import importlib
 import os
-from menu import MenuDisplay
-from feedback import FeedbackSystem
-from export import ExportData
-from analytics import FeedbackAnalytics
+import sys
+import time
+from contextlib import contextmanager
+
+# Set CAFETERIA_STARTUP_TIMING=1 to print how long each import and tab takes
+STARTUP_TIMING = os.environ.get("CAFETERIA_STARTUP_TIMING") == "1"
+_process_start = time.perf_counter()
+
+@contextmanager
+def timed(label):
+    """Print the time spent in the block when startup timing is enabled"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if STARTUP_TIMING:
+            print(f"[timing] {label}: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+def lazy_import(name):
+    """Import a module the first time it is needed.
+    
+    analytics pulls in pandas, NumPy and Matplotlib, so it and export are
+    only loaded when the admin panel first uses them.
+    """
+    module = sys.modules.get(name)
+    if module is None:
+        with timed(f"import {name}"):
+            module = importlib.import_module(name)
+    return module
+
+with timed("import gi"):
+    import gi
+    gi.require_version('Gtk', '3.0')
+    from gi.repository import Gtk, GdkPixbuf, Gdk, GLib
 
 class CafeteriaManagementSystem(Gtk.Window):
     def __init__(self):
@@ -60,23 +88,52 @@ class CafeteriaManagementSystem(Gtk.Window):
         self.notebook.set_tab_pos(Gtk.PositionType.TOP)
         self.main_box.pack_start(self.notebook, True, True, 0)
         
+        # Tabs start out empty and are filled in the first time they are shown
+        self.menu_display = None
+        self.feedback_system = None
+        self.tab_builders = {}
+        
         # Menu Tab
         self.menu_tab = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
-        self.menu_display = MenuDisplay(self.menu_tab)
         menu_label = Gtk.Label(label="Menu")
         self.notebook.append_page(self.menu_tab, menu_label)
+        self.tab_builders[self.menu_tab] = self.create_menu_tab
         
         # Feedback Tab
         self.feedback_tab = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
-        self.feedback_system = FeedbackSystem(self.feedback_tab)
         feedback_label = Gtk.Label(label="Feedback")
         self.notebook.append_page(self.feedback_tab, feedback_label)
+        self.tab_builders[self.feedback_tab] = self.create_feedback_tab
         
         # Admin Tab
         self.admin_tab = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
         admin_label = Gtk.Label(label="Admin")
         self.notebook.append_page(self.admin_tab, admin_label)
-        self.create_admin_panel()
+        self.tab_builders[self.admin_tab] = self.create_admin_panel
+        
+        # Build the tab shown at startup now, the others on first activation
+        self.notebook.connect("switch-page", self.on_switch_page)
+        self.ensure_tab(self.notebook.get_nth_page(self.notebook.get_current_page()))
+    
+    def on_switch_page(self, notebook, page, page_num):
+        self.ensure_tab(page)
+    
+    def ensure_tab(self, tab):
+        """Build a tab's contents if that has not happened yet"""
+        builder = self.tab_builders.pop(tab, None)
+        if builder is None:
+            return
+        with timed(f"build {builder.__name__}"):
+            builder()
+        tab.show_all()
+    
+    def create_menu_tab(self):
+        MenuDisplay = lazy_import("menu").MenuDisplay
+        self.menu_display = MenuDisplay(self.menu_tab)
+    
+    def create_feedback_tab(self):
+        FeedbackSystem = lazy_import("feedback").FeedbackSystem
+        self.feedback_system = FeedbackSystem(self.feedback_tab)
     
     def create_admin_panel(self):
         # Create a box for admin content
@@ -115,9 +172,55 @@ class CafeteriaManagementSystem(Gtk.Window):
         box.pack_start(report_button, False, False, 5)
     
     def export_feedback(self, button):
-        exporter = ExportData()
-        success = exporter.export_to_sheets()
+        exporter = lazy_import("export").ExportData()
+        file_path = exporter.choose_export_file(self)
+        if not file_path:
+            return
+        
+        # Run the export on a worker thread so the window stays responsive
+        button.set_sensitive(False)
+        progress_dialog, progress_bar = self.create_export_progress_dialog()
+        
+        def on_progress(written, total):
+            if total:
+                progress_bar.set_fraction(written / total)
+                progress_bar.set_text(f"{written} of {total} entries")
+            else:
+                progress_bar.pulse()
+                progress_bar.set_text(f"{written} entries")
+        
+        def on_done(success, path):
+            progress_dialog.destroy()
+            button.set_sensitive(True)
+            self.show_export_result(success, path)
+        
+        exporter.export_in_background(file_path, on_progress, on_done)
+    
+    def create_export_progress_dialog(self):
+        """Show a small non-blocking window with a progress bar"""
+        dialog = Gtk.Window(title="Exporting Feedback")
+        dialog.set_transient_for(self)
+        dialog.set_modal(True)
+        dialog.set_deletable(False)
+        dialog.set_position(Gtk.WindowPosition.CENTER_ON_PARENT)
+        dialog.set_default_size(300, -1)
         
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        box.set_border_width(15)
+        dialog.add(box)
+        
+        label = Gtk.Label(label="Exporting feedback data...")
+        label.set_halign(Gtk.Align.START)
+        box.pack_start(label, False, False, 0)
+        
+        progress_bar = Gtk.ProgressBar()
+        progress_bar.set_show_text(True)
+        box.pack_start(progress_bar, False, False, 0)
+        
+        dialog.show_all()
+        return dialog, progress_bar
+    
+    def show_export_result(self, success, file_path):
         if success:
             dialog = Gtk.MessageDialog(
                 transient_for=self,
@@ -126,7 +229,7 @@ class CafeteriaManagementSystem(Gtk.Window):
                 buttons=Gtk.ButtonsType.OK,
                 text="Export Successful",
             )
-            dialog.format_secondary_text("Feedback data exported to Google Sheets format successfully!")
+            dialog.format_secondary_text(f"Feedback data exported to {file_path} in Google Sheets format.")
         else:
             dialog = Gtk.MessageDialog(
                 transient_for=self,
@@ -147,18 +250,19 @@ class CafeteriaManagementSystem(Gtk.Window):
         feedback_window.set_position(Gtk.WindowPosition.CENTER_ON_PARENT)
         
         # This would display a summary of the feedback
+        self.ensure_tab(self.feedback_tab)
         self.feedback_system.display_summary(feedback_window)
         
         feedback_window.show_all()
     
     def show_data_analysis(self, button):
         """Show the data analysis dialog"""
-        analytics = FeedbackAnalytics()
+        analytics = lazy_import("analytics").FeedbackAnalytics()
         analytics.show_analysis(self)
     
     def generate_report(self, button):
         """Generate a comprehensive analytics report"""
-        analytics = FeedbackAnalytics()
+        analytics = lazy_import("analytics").FeedbackAnalytics()
         report_path = analytics.save_report()
         
         dialog = Gtk.MessageDialog(
@@ -179,7 +283,15 @@ if __name__ == "__main__":
     if not os.path.exists("images"):
         os.makedirs("images")
         
-    win = CafeteriaManagementSystem()
-    win.connect("destroy", Gtk.main_quit)
-    win.show_all()
+    with timed("build main window"):
+        win = CafeteriaManagementSystem()
+        win.connect("destroy", Gtk.main_quit)
+        win.show_all()
+    
+    if STARTUP_TIMING:
+        # The first idle callback runs once the window has been drawn
+        def report_startup():
+            print(f"[timing] startup total: {(time.perf_counter() - _process_start) * 1000:.1f} ms")
+            return False
+        GLib.idle_add(report_startup)
     Gtk.main()
\ No newline at end of file
@@ -1,14 +1,20 @@
 import gi
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, GdkPixbuf, GLib
+from gi.repository import Gtk, GLib
 import os
-from database import Database
+from database import get_database
+from image_cache import get_pixbuf_cache
 from datetime import datetime
 
 class MenuDisplay:
     def __init__(self, parent):
         self.parent = parent
-        self.db = Database()
+        self.db = get_database()
+        
+        # Background image loads for the cards currently shown; bumping the
+        # generation makes results for an earlier date be ignored
+        self.image_generation = 0
+        self.pending_image_loads = []
         self.create_menu_view()
         
     def create_menu_view(self):
@@ -33,14 +39,8 @@ class MenuDisplay:
         date_label = Gtk.Label(label="Select Date:")
         date_box.pack_start(date_label, False, False, 5)
         
-        # Get all unique dates from menu items
-        all_dates = set()
-        menu_items = self.db.get_all_menu_items()
-        for item in menu_items:
-            all_dates.update(item.get("dates_served", []))
-        
-        # Convert to list and sort
-        date_list = sorted(list(all_dates))
+        # Get all dates on which something is served (already sorted)
+        date_list = self.db.get_menu_dates()
         
         # Default to today if it exists in the list, otherwise use the first date
         today = datetime.now().strftime("%Y-%m-%d")
@@ -73,6 +73,15 @@ class MenuDisplay:
         self.content_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
         scrolled.add(self.content_box)
         
+        # Shown instead of the cards when nothing is served on the selected date
+        self.empty_label = Gtk.Label(label="No menu items available for this date.")
+        self.empty_label.set_margin_top(20)
+        self.empty_label.set_no_show_all(True)
+        self.content_box.pack_start(self.empty_label, False, False, 0)
+        
+        # Cards are created on demand and reused across dates
+        self.cards = []
+        
         # Load initial menu
         self.update_menu_display()
     
@@ -80,69 +89,132 @@ class MenuDisplay:
         self.update_menu_display()
     
     def update_menu_display(self):
-        # Clear previous menu items
-        for child in self.content_box.get_children():
-            self.content_box.remove(child)
+        # Stop loading images for the previous date
+        self.cancel_image_loads()
         
         # Get selected date
         active = self.date_combo.get_active()
-        if active < 0:
-            return
+        selected_date = self.date_combo.get_active_text() if active >= 0 else None
         
-        selected_date = self.date_combo.get_active_text()
+        # Get menu items for the selected date from the date index
+        items_for_date = self.db.get_menu_items_for_date(selected_date) if selected_date else []
         
-        # Get menu items for the selected date
-        menu_items = self.db.get_all_menu_items()
-        items_for_date = [item for item in menu_items if selected_date in item.get("dates_served", [])]
+        # Reuse the existing cards, creating more only when this date has
+        # more items than any date shown before
+        while len(self.cards) < len(items_for_date):
+            self.cards.append(self.create_menu_item_card())
         
-        if not items_for_date:
-            label = Gtk.Label(label="No menu items available for this date.")
-            label.set_margin_top(20)
-            self.content_box.pack_start(label, False, False, 0)
-            self.content_box.show_all()
-            return
+        for idx, card in enumerate(self.cards):
+            if idx < len(items_for_date):
+                self.update_menu_item_card(card, items_for_date[idx])
+                card.show()
+            else:
+                card.hide()
         
-        # Display menu items
-        for idx, item in enumerate(items_for_date):
-            self.create_menu_item_card(item, idx)
+        self.empty_label.set_visible(selected_date is not None and not items_for_date)
+    
+    def cancel_image_loads(self):
+        """Drop image loads started for the items that are about to be replaced"""
+        self.image_generation += 1
+        for future in self.pending_image_loads:
+            future.cancel()
+        self.pending_image_loads = []
+    
+    def on_image_loaded(self, card, img_path, generation, pixbuf, error):
+        """Swap a card's placeholder for its photo once it has loaded"""
+        if generation != self.image_generation:
+            return
         
-        self.content_box.show_all()
+        if pixbuf:
+            card.show_pixbuf(pixbuf)
+        else:
+            print(f"Error loading image {img_path}: {error}")
+            card.show_no_image()
     
-    def create_menu_item_card(self, item, idx):
-        # Create a card frame
-        card = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
-        card.get_style_context().add_class("card")
+    def create_menu_item_card(self):
+        card = MenuItemCard()
         self.content_box.pack_start(card, False, False, 5)
+        card.show_all()
+        return card
+    
+    def update_menu_item_card(self, card, item):
+        card.set_item(item)
         
-        # Image
+        # Image: shows a placeholder until the photo has loaded
         img_path = os.path.join("images", item.get("image", "default.jpg"))
-        if os.path.exists(img_path):
-            try:
-                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(img_path, 100, 100)
-                image = Gtk.Image.new_from_pixbuf(pixbuf)
-                card.pack_start(image, False, False, 0)
-            except GLib.Error as e:
-                print(f"Error loading image {img_path}: {e}")
-                image = Gtk.Label(label="No Image")
-                card.pack_start(image, False, False, 0)
-        else:
-            image = Gtk.Label(label="No Image")
-            card.pack_start(image, False, False, 0)
+        if not os.path.exists(img_path):
+            card.show_no_image()
+            return
+        
+        cache = get_pixbuf_cache()
+        pixbuf = cache.peek(img_path, 100, 100)
+        if pixbuf:
+            card.show_pixbuf(pixbuf)
+            return
+        
+        card.show_placeholder()
+        future = cache.load_async(
+            img_path, 100, 100,
+            lambda pixbuf, error, generation=self.image_generation:
+                self.on_image_loaded(card, img_path, generation, pixbuf, error)
+        )
+        self.pending_image_loads.append(future)
+
+class MenuItemCard(Gtk.Box):
+    """Card showing one menu item; cards are reused as the selected date changes"""
+    def __init__(self):
+        Gtk.Box.__init__(self, orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        self.get_style_context().add_class("card")
+        
+        # Image slot holding either the photo (or its placeholder) or a text
+        image_slot = Gtk.Box()
+        image_slot.set_size_request(100, 100)
+        self.pack_start(image_slot, False, False, 0)
+        
+        self.image = Gtk.Image()
+        self.image.set_no_show_all(True)
+        image_slot.pack_start(self.image, True, True, 0)
+        
+        self.no_image_label = Gtk.Label(label="No Image")
+        self.no_image_label.set_no_show_all(True)
+        image_slot.pack_start(self.no_image_label, True, True, 0)
         
         # Item details in a vertical box
         details_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
-        card.pack_start(details_box, True, True, 5)
+        self.pack_start(details_box, True, True, 5)
         
         # Item name
-        name_label = Gtk.Label()
-        name_label.set_markup(f"<b>{item.get('name', 'Unnamed Item')}</b>")
-        name_label.set_halign(Gtk.Align.START)
-        details_box.pack_start(name_label, False, False, 0)
+        self.name_label = Gtk.Label()
+        self.name_label.set_halign(Gtk.Align.START)
+        details_box.pack_start(self.name_label, False, False, 0)
         
         # Components
+        self.comp_label = Gtk.Label()
+        self.comp_label.set_halign(Gtk.Align.START)
+        self.comp_label.set_no_show_all(True)
+        details_box.pack_start(self.comp_label, False, False, 0)
+    
+    def set_item(self, item):
+        """Show the name and components of a menu item"""
+        name = GLib.markup_escape_text(item.get('name', 'Unnamed Item'))
+        self.name_label.set_markup(f"<b>{name}</b>")
+        
         components = item.get("components", [])
         if components:
             comp_text = "Components: " + ", ".join([comp.get("name", "") for comp in components])
-            comp_label = Gtk.Label(label=comp_text)
-            comp_label.set_halign(Gtk.Align.START)
-            details_box.pack_start(comp_label, False, False, 0)
\ No newline at end of file
+            self.comp_label.set_label(comp_text)
+        self.comp_label.set_visible(bool(components))
+    
+    def show_pixbuf(self, pixbuf):
+        self.image.set_from_pixbuf(pixbuf)
+        self.no_image_label.hide()
+        self.image.show()
+    
+    def show_placeholder(self):
+        self.image.set_from_icon_name("image-loading", Gtk.IconSize.DIALOG)
+        self.no_image_label.hide()
+        self.image.show()
+    
+    def show_no_image(self):
+        self.image.hide()
+        self.no_image_label.show()
@@ -0,0 +1,158 @@
+import numpy as np
+from matplotlib.figure import Figure
+from rating_aggregates import MAX_RATING, MIN_RATING
+
+# Drawing of the analytics plots from the data returned by the
+# FeedbackAnalytics *_data methods. It is kept out of analytics.py so that
+# report worker processes only import NumPy and matplotlib, not pandas and
+# the database; the plot data is made of NumPy arrays and lists for the
+# same reason.
+
+# Resolution of the PNGs saved by save_report
+REPORT_DPI = 100
+
+# Heatmap limits for menus with many dishes: above how many cells values
+# are no longer printed in each cell, and how many tick labels are drawn
+# along an axis at most
+HEATMAP_ANNOTATION_LIMIT = 300
+HEATMAP_MAX_TICKS = 60
+
+# Most points per time series line that still get a marker
+TREND_MARKER_LIMIT = 60
+
+def draw_component_ratings(data):
+    # Create figure
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    
+    # Create bar chart
+    bars = ax.bar(data['components'], data['means'], yerr=data['std'], 
+                 capsize=5, color='skyblue', edgecolor='black')
+    
+    # Add rating values on top of bars
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
+               f'{height:.2f}', ha='center', va='bottom')
+    
+    # Customize plot
+    ax.set_xlabel('Component')
+    ax.set_ylabel('Average Rating')
+    ax.set_title('Average Component Ratings')
+    ax.set_ylim(0, 5.5)  # Ratings are from 1-5
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    
+    # Rotate x labels if there are many components
+    if len(data['components']) > 4:
+        for label in ax.get_xticklabels():
+            label.set_rotation(45)
+            label.set_horizontalalignment('right')
+    
+    fig.tight_layout()
+    return fig
+
+def draw_time_series(data):
+    # Create figure
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+    
+    # Plot each component as a line; markers only while they can be told apart
+    marker = 'o' if len(data["dates"]) <= TREND_MARKER_LIMIT else None
+    for comp_name, ratings in data["series"]:
+        ax.plot(data["dates"], ratings, 
+               marker=marker, linestyle='-', label=comp_name)
+    
+    # Customize plot
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Average Rating')
+    ax.set_title(f'Rating Trends Over Time ({data["description"]})')
+    ax.set_ylim(0, 5.5)
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.legend()
+    
+    fig.tight_layout()
+    return fig
+
+def draw_histogram(counts):
+    # Create figure
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    
+    # One bar per rating value, drawn from the precomputed counts
+    ratings = np.arange(MIN_RATING, MAX_RATING + 1)
+    bars = ax.bar(ratings, counts, width=1.0,
+                  color='skyblue', edgecolor='black', alpha=0.7)
+    
+    # Add count labels
+    for bar in bars:
+        height = bar.get_height()
+        if height > 0:
+            ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
+                   int(height), ha='center', va='bottom')
+    
+    # Customize plot
+    ax.set_xlabel('Rating')
+    ax.set_ylabel('Count')
+    ax.set_title('Distribution of Ratings')
+    ax.set_xticks(ratings)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+    
+    fig.tight_layout()
+    return fig
+
+def draw_heatmap(data):
+    values = data["values"]
+    n_items, n_components = values.shape
+    
+    # Create figure, growing with the matrix up to a readable maximum
+    fig = Figure(figsize=(min(max(10, 4 + 0.4 * n_components), 24),
+                          min(max(8, 2 + 0.25 * n_items), 24)))
+    ax = fig.subplots()
+    
+    # Create heatmap as a single image; cells without ratings stay blank
+    im = ax.imshow(values, cmap='YlGn', aspect='auto', interpolation='nearest')
+    
+    # Customize plot
+    ax.set_xlabel('Component')
+    ax.set_ylabel('Item')
+    ax.set_title('Average Ratings by Item and Component')
+    
+    # Set x and y ticks, labelling only every n-th row/column of large matrices
+    x_ticks = np.arange(0, n_components, -(-n_components // HEATMAP_MAX_TICKS))
+    y_ticks = np.arange(0, n_items, -(-n_items // HEATMAP_MAX_TICKS))
+    ax.set_xticks(x_ticks)
+    ax.set_yticks(y_ticks)
+    ax.set_xticklabels([data["components"][i] for i in x_ticks], rotation=45, ha="right", rotation_mode="anchor")
+    ax.set_yticklabels([data["items"][i] for i in y_ticks])
+    
+    # Add colorbar
+    cbar = fig.colorbar(im, ax=ax)
+    cbar.set_label('Average Rating')
+    
+    # Add text annotations, unless there are too many cells to read them
+    if values.size <= HEATMAP_ANNOTATION_LIMIT:
+        for i, j in zip(*np.nonzero(~np.isnan(values))):
+            ax.text(j, i, f"{values[i, j]:.2f}", ha="center", va="center", color="black")
+    
+    fig.tight_layout()
+    return fig
+
+# Plot name -> function drawing it from the output of the matching *_data method
+PLOT_RENDERERS = {
+    "ratings_bar": draw_component_ratings,
+    "time_series": draw_time_series,
+    "histogram": draw_histogram,
+    "heatmap": draw_heatmap,
+}
+
+def render_plot(name, data):
+    """Draw a plot from its data, or return None if there is nothing to plot"""
+    if data is None:
+        return None
+    return PLOT_RENDERERS[name](data)
+
+def save_plot(name, data, path):
+    """Render a plot straight to a PNG file (used by report worker processes)"""
+    fig = render_plot(name, data)
+    fig.savefig(path, dpi=REPORT_DPI)
+    return path
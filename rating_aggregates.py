@@ -0,0 +1,187 @@
+import copy
+import json
+import math
+import os
+
+# Ratings are whole numbers on this scale; the histogram has one bucket per value
+MIN_RATING = 1
+MAX_RATING = 5
+
+# Journaled updates folded into the statistics file at a time
+JOURNAL_LIMIT = 1000
+
+def new_stats():
+    """Empty running statistics for a set of ratings"""
+    return {
+        "count": 0,
+        "sum": 0,
+        "sum_sq": 0,
+        "min": None,
+        "max": None,
+        "histogram": [0] * (MAX_RATING - MIN_RATING + 1)
+    }
+
+def add_rating(stats, rating):
+    """Fold one rating into running statistics"""
+    stats["count"] += 1
+    stats["sum"] += rating
+    stats["sum_sq"] += rating * rating
+    stats["min"] = rating if stats["min"] is None else min(stats["min"], rating)
+    stats["max"] = rating if stats["max"] is None else max(stats["max"], rating)
+    if MIN_RATING <= rating <= MAX_RATING:
+        stats["histogram"][rating - MIN_RATING] += 1
+
+def merge_stats(stats, other):
+    """Fold the statistics of another set of ratings into ``stats``"""
+    if not other["count"]:
+        return stats
+    stats["count"] += other["count"]
+    stats["sum"] += other["sum"]
+    stats["sum_sq"] += other["sum_sq"]
+    stats["min"] = other["min"] if stats["min"] is None else min(stats["min"], other["min"])
+    stats["max"] = other["max"] if stats["max"] is None else max(stats["max"], other["max"])
+    stats["histogram"] = [a + b for a, b in zip(stats["histogram"], other["histogram"])]
+    return stats
+
+def stats_mean(stats):
+    return stats["sum"] / stats["count"] if stats["count"] else float("nan")
+
+def stats_std(stats):
+    """Sample standard deviation (ddof=1, as pandas computes it)"""
+    count = stats["count"]
+    if count < 2:
+        return float("nan")
+    variance = (stats["sum_sq"] - stats["sum"] * stats["sum"] / count) / (count - 1)
+    return math.sqrt(max(variance, 0.0))
+
+def stats_median(stats):
+    """Median rating, read from the histogram"""
+    count = stats["count"]
+    if not count:
+        return float("nan")
+
+    def value_at(position):
+        seen = 0
+        for offset, bucket in enumerate(stats["histogram"]):
+            seen += bucket
+            if seen > position:
+                return MIN_RATING + offset
+        return stats["max"]
+
+    if count % 2:
+        return float(value_at(count // 2))
+    return (value_at(count // 2 - 1) + value_at(count // 2)) / 2
+
+class RatingAggregates:
+    """Persisted running rating statistics per component and per (component, item).
+
+    Like FeedbackColumnStore, the file records the size of the feedback log
+    it reflects, and is rebuilt when that no longer matches.
+
+    Rewriting the whole file costs time in the number of (component, item)
+    pairs, so new feedback is appended to a journal next to it instead,
+    one line per entry, and the journal is folded into the file every
+    JOURNAL_LIMIT entries.
+    """
+
+    def __init__(self, path="data/rating_aggregates.json"):
+        self.path = path
+        self.journal_file = os.path.splitext(path)[0] + ".journal"
+        self._data = None
+        self._journaled = 0
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path, 'r') as f:
+                    raw = json.load(f)
+                self._data = {
+                    "log_size": raw["log_size"],
+                    "generation": raw.get("generation"),
+                    "components": {int(comp_id): stats
+                                   for comp_id, stats in raw["components"].items()},
+                    "items": {int(comp_id): {int(item_id): stats for item_id, stats in items.items()}
+                              for comp_id, items in raw["items"].items()}
+                }
+            except (OSError, ValueError, KeyError, TypeError):
+                self._data = {"log_size": None, "generation": None, "components": {}, "items": {}}
+            self._replay_journal()
+        return self._data
+
+    def _replay_journal(self):
+        """Apply the journaled entries that follow on from the loaded file"""
+        self._journaled = 0
+        try:
+            with open(self.journal_file, 'r') as f:
+                for line in f:
+                    update = json.loads(line)
+                    # Entries already folded into the file, or from before the
+                    # log was rewritten, do not follow on
+                    if (update["log_size_before"] != self._data["log_size"] or
+                            update["generation"] != self._data["generation"]):
+                        continue
+                    self._add_ratings(update["item_id"], update["ratings"].items())
+                    self._data["log_size"] = update["log_size_after"]
+                    self._journaled += 1
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # A torn last line leaves the aggregates behind the log, so they
+            # are rebuilt
+            pass
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._data, f)
+        os.replace(tmp_path, self.path)
+        # The file now includes every journaled entry
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self._journaled = 0
+
+    def is_current(self, log_size, generation):
+        """Check whether the aggregates cover the log of the given size and generation"""
+        data = self._load()
+        return data["log_size"] == log_size and data["generation"] == generation
+
+    def _add_ratings(self, item_id, ratings):
+        for comp_id, rating in ratings:
+            comp_id = int(comp_id)
+            add_rating(self._data["components"].setdefault(comp_id, new_stats()), rating)
+            item_stats = self._data["items"].setdefault(comp_id, {})
+            add_rating(item_stats.setdefault(item_id, new_stats()), rating)
+
+    def _add_feedback(self, record):
+        self._add_ratings(record.item_id, record.ratings.items())
+
+    def apply(self, record, log_size_before, log_size_after, generation):
+        """Update the aggregates with one feedback entry that was just logged.
+
+        Does nothing if the aggregates were already out of date; they are
+        then rebuilt on the next read.
+        """
+        if not self.is_current(log_size_before, generation):
+            return False
+        self._add_feedback(record)
+        self._data["log_size"] = log_size_after
+
+        if self._journaled + 1 >= JOURNAL_LIMIT:
+            self._save()
+        else:
+            with open(self.journal_file, 'a') as f:
+                f.write(json.dumps({"log_size_before": log_size_before, "log_size_after": log_size_after,
+                                    "generation": generation, "item_id": record.item_id,
+                                    "ratings": record.ratings}) + "\n")
+            self._journaled += 1
+        return True
+
+    def rebuild(self, entries, log_size, generation):
+        """Recompute the aggregates from the given FeedbackRecords"""
+        self._data = {"log_size": log_size, "generation": generation, "components": {}, "items": {}}
+        for fb in entries:
+            self._add_feedback(fb)
+        self._save()
+
+    def snapshot(self):
+        """Statistics keyed by component ID, and by component ID then item ID"""
+        data = self._load()
+        return copy.deepcopy({"components": data["components"], "items": data["items"]})
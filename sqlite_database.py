@@ -0,0 +1,429 @@
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from feedback_record import TIMESTAMP_FORMAT, FeedbackRecord
+from feedback_table import FeedbackTable
+from rating_aggregates import merge_stats, new_stats
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS menu_items (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        image TEXT
+    );
+    CREATE TABLE IF NOT EXISTS components (
+        id INTEGER PRIMARY KEY,
+        item_id INTEGER NOT NULL REFERENCES menu_items(id),
+        position INTEGER NOT NULL,
+        name TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS menu_dates (
+        item_id INTEGER NOT NULL REFERENCES menu_items(id),
+        date_served TEXT NOT NULL,
+        PRIMARY KEY (item_id, date_served)
+    );
+    CREATE TABLE IF NOT EXISTS feedback (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        item_id INTEGER NOT NULL,
+        item_name TEXT,
+        timestamp TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS feedback_ratings (
+        feedback_id INTEGER NOT NULL REFERENCES feedback(id),
+        component_id INTEGER NOT NULL,
+        rating INTEGER NOT NULL,
+        PRIMARY KEY (feedback_id, component_id)
+    );
+    CREATE TABLE IF NOT EXISTS rating_stats (
+        component_id INTEGER NOT NULL,
+        item_id INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        total_sq INTEGER NOT NULL,
+        min_rating INTEGER NOT NULL,
+        max_rating INTEGER NOT NULL,
+        h1 INTEGER NOT NULL,
+        h2 INTEGER NOT NULL,
+        h3 INTEGER NOT NULL,
+        h4 INTEGER NOT NULL,
+        h5 INTEGER NOT NULL,
+        PRIMARY KEY (component_id, item_id)
+    );
+    -- Keep rating_stats up to date as ratings are inserted
+    CREATE TRIGGER IF NOT EXISTS trg_rating_stats AFTER INSERT ON feedback_ratings
+    BEGIN
+        INSERT INTO rating_stats VALUES (
+            NEW.component_id,
+            (SELECT item_id FROM feedback WHERE id = NEW.feedback_id),
+            1, NEW.rating, NEW.rating * NEW.rating, NEW.rating, NEW.rating,
+            NEW.rating = 1, NEW.rating = 2, NEW.rating = 3, NEW.rating = 4, NEW.rating = 5
+        )
+        ON CONFLICT (component_id, item_id) DO UPDATE SET
+            count = count + 1,
+            total = total + excluded.total,
+            total_sq = total_sq + excluded.total_sq,
+            min_rating = MIN(min_rating, excluded.min_rating),
+            max_rating = MAX(max_rating, excluded.max_rating),
+            h1 = h1 + excluded.h1,
+            h2 = h2 + excluded.h2,
+            h3 = h3 + excluded.h3,
+            h4 = h4 + excluded.h4,
+            h5 = h5 + excluded.h5;
+    END;
+    CREATE INDEX IF NOT EXISTS idx_components_item ON components(item_id);
+    CREATE INDEX IF NOT EXISTS idx_menu_dates_date ON menu_dates(date_served);
+    CREATE INDEX IF NOT EXISTS idx_feedback_item ON feedback(item_id);
+    CREATE INDEX IF NOT EXISTS idx_feedback_timestamp ON feedback(timestamp);
+    CREATE INDEX IF NOT EXISTS idx_ratings_component ON feedback_ratings(component_id);
+"""
+
+def _sql_timestamp(value):
+    """Format a datetime, date or date string like the stored timestamps"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        return value.strftime(TIMESTAMP_FORMAT)
+    return value.strftime("%Y-%m-%d")
+
+class SQLiteDatabase:
+    """SQLite implementation of the Database interface"""
+
+    def __init__(self, db_file="data/cafeteria.db"):
+        self.db_file = db_file
+        self.menu_file = "data/menu.json"
+        self._init_db()
+
+    def _connect(self):
+        # A short-lived connection per call keeps the engine safe to use
+        # from worker threads
+        conn = sqlite3.connect(self.db_file)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        """Create tables and import the JSON data on first use"""
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+            has_menu = conn.execute("SELECT 1 FROM menu_items LIMIT 1").fetchone()
+
+            # Databases created before rating_stats existed need it filled once
+            has_stats = conn.execute("SELECT 1 FROM rating_stats LIMIT 1").fetchone()
+            if not has_stats:
+                with conn:
+                    conn.execute(
+                        "INSERT INTO rating_stats "
+                        "SELECT r.component_id, f.item_id, COUNT(*), SUM(r.rating), "
+                        "SUM(r.rating * r.rating), MIN(r.rating), MAX(r.rating), "
+                        "SUM(r.rating = 1), SUM(r.rating = 2), SUM(r.rating = 3), "
+                        "SUM(r.rating = 4), SUM(r.rating = 5) "
+                        "FROM feedback_ratings r JOIN feedback f ON f.id = r.feedback_id "
+                        "GROUP BY r.component_id, f.item_id"
+                    )
+
+        if not has_menu:
+            self.import_from_json()
+
+    def import_from_json(self, menu_file=None, feedback_db=None):
+        """Load the existing menu.json and feedback log into the database.
+
+        The menu is always replaced; feedback is only imported into an empty
+        feedback table so running the importer twice does not duplicate it.
+        """
+        try:
+            if feedback_db is None:
+                from database import Database
+                feedback_db = Database()
+
+            with open(menu_file or self.menu_file, 'r') as f:
+                menu_items = json.load(f).get("menu_items", [])
+
+            with closing(self._connect()) as conn, conn:
+                self._import_menu(conn, menu_items)
+
+                has_feedback = conn.execute("SELECT 1 FROM feedback LIMIT 1").fetchone()
+                imported = 0
+                if not has_feedback:
+                    for fb in feedback_db.get_all_feedback():
+                        self._insert_feedback(conn, fb)
+                        imported += 1
+
+            print(f"Imported {len(menu_items)} menu items and {imported} feedback entries into {self.db_file}")
+            return True
+        except Exception as e:
+            print(f"Error importing JSON data: {e}")
+            return False
+
+    def _import_menu(self, conn, menu_items):
+        conn.execute("DELETE FROM menu_dates")
+        conn.execute("DELETE FROM components")
+        conn.execute("DELETE FROM menu_items")
+
+        for item in menu_items:
+            conn.execute(
+                "INSERT INTO menu_items (id, name, image) VALUES (?, ?, ?)",
+                (item["id"], item.get("name", ""), item.get("image"))
+            )
+            conn.executemany(
+                "INSERT INTO components (id, item_id, position, name) VALUES (?, ?, ?, ?)",
+                [(comp["id"], item["id"], pos, comp.get("name", ""))
+                 for pos, comp in enumerate(item.get("components", []))]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO menu_dates (item_id, date_served) VALUES (?, ?)",
+                [(item["id"], date) for date in item.get("dates_served", [])]
+            )
+
+    def _insert_feedback(self, conn, record):
+        cursor = conn.execute(
+            "INSERT INTO feedback (item_id, item_name, timestamp) VALUES (?, ?, ?)",
+            (record.item_id, record.item_name, record.timestamp.strftime(TIMESTAMP_FORMAT))
+        )
+        conn.executemany(
+            "INSERT INTO feedback_ratings (feedback_id, component_id, rating) VALUES (?, ?, ?)",
+            [(cursor.lastrowid, comp_id, rating) for comp_id, rating in record.ratings.items()]
+        )
+
+    def get_all_menu_items(self):
+        """Retrieve all menu items"""
+        try:
+            with closing(self._connect()) as conn:
+                items = conn.execute("SELECT id, name, image FROM menu_items ORDER BY id").fetchall()
+                return [self._build_menu_item(conn, row) for row in items]
+        except Exception as e:
+            print(f"Error loading menu data: {e}")
+            return []
+
+    def get_menu_item(self, item_id):
+        """Get a specific menu item by ID"""
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT id, name, image FROM menu_items WHERE id = ?", (item_id,)
+                ).fetchone()
+                return self._build_menu_item(conn, row) if row else None
+        except Exception as e:
+            print(f"Error loading menu item {item_id}: {e}")
+            return None
+
+    def get_menu_dates(self):
+        """All dates on which at least one menu item is served, sorted"""
+        try:
+            with closing(self._connect()) as conn:
+                rows = conn.execute(
+                    "SELECT DISTINCT date_served FROM menu_dates ORDER BY date_served"
+                ).fetchall()
+            return [row["date_served"] for row in rows]
+        except Exception as e:
+            print(f"Error loading menu data: {e}")
+            return []
+
+    def get_menu_items_for_date(self, date):
+        """Menu items served on a date ("YYYY-MM-DD"), in menu order"""
+        try:
+            with closing(self._connect()) as conn:
+                rows = conn.execute(
+                    "SELECT m.id, m.name, m.image FROM menu_dates d "
+                    "JOIN menu_items m ON m.id = d.item_id "
+                    "WHERE d.date_served = ? ORDER BY m.id",
+                    (date,)
+                ).fetchall()
+                return [self._build_menu_item(conn, row) for row in rows]
+        except Exception as e:
+            print(f"Error loading menu data: {e}")
+            return []
+
+    def get_component(self, component_id):
+        """Get a component (with its item ID and name) by component ID"""
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT c.id, c.name, c.item_id, m.name AS item_name "
+                    "FROM components c JOIN menu_items m ON m.id = c.item_id WHERE c.id = ?",
+                    (component_id,)
+                ).fetchone()
+            return dict(row) if row else None
+        except Exception as e:
+            print(f"Error loading component {component_id}: {e}")
+            return None
+
+    def _build_menu_item(self, conn, row):
+        components = conn.execute(
+            "SELECT id, name FROM components WHERE item_id = ? ORDER BY position",
+            (row["id"],)
+        ).fetchall()
+        dates = conn.execute(
+            "SELECT date_served FROM menu_dates WHERE item_id = ? ORDER BY date_served",
+            (row["id"],)
+        ).fetchall()
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "image": row["image"],
+            "components": [{"id": comp["id"], "name": comp["name"]} for comp in components],
+            "dates_served": [date["date_served"] for date in dates]
+        }
+
+    def add_feedback(self, feedback_data):
+        """Add new feedback entry, validated and normalized like Database.add_feedback"""
+        try:
+            record = FeedbackRecord.from_dict(feedback_data, timestamp=datetime.now())
+            record.validate()
+            with closing(self._connect()) as conn, conn:
+                self._insert_feedback(conn, record)
+            return True
+        except Exception as e:
+            print(f"Error saving feedback: {e}")
+            return False
+
+    def get_all_feedback(self):
+        """Retrieve all feedback as a FeedbackTable"""
+        return self._query_feedback("", ())
+
+    def iter_feedback(self, since=None, until=None, start=0, stop=None):
+        """Iterate over FeedbackRecords without loading them all into memory.
+
+        ``since`` (inclusive) and ``until`` (exclusive) limit the entries by
+        timestamp; ``start`` and ``stop`` by feedback ID (see
+        get_feedback_high_water).
+        """
+        conditions = ["f.id > ?"]
+        params = [start]
+        if stop is not None:
+            conditions.append("f.id <= ?")
+            params.append(stop)
+        if since is not None:
+            conditions.append("f.timestamp >= ?")
+            params.append(_sql_timestamp(since))
+        if until is not None:
+            conditions.append("f.timestamp < ?")
+            params.append(_sql_timestamp(until))
+
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "SELECT f.id, f.item_id, f.item_name, f.timestamp, "
+                "r.component_id, r.rating "
+                "FROM feedback f LEFT JOIN feedback_ratings r ON r.feedback_id = f.id "
+                f"WHERE {' AND '.join(conditions)} ORDER BY f.id",
+                params
+            )
+            current = None
+            current_id = None
+            for row in cursor:
+                if row["id"] != current_id:
+                    if current is not None:
+                        yield current
+                    current_id = row["id"]
+                    current = self._build_feedback_record(row)
+                if row["component_id"] is not None:
+                    current.ratings[row["component_id"]] = row["rating"]
+            if current is not None:
+                yield current
+
+    def get_feedback_high_water(self):
+        """Highest feedback ID; pass it as ``start`` to iter_feedback to get newer entries"""
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM feedback").fetchone()[0]
+
+    def get_data_version(self):
+        """Token that changes whenever the feedback or the menu changes"""
+        # Every committed write goes to the database file itself
+        stat = os.stat(self.db_file)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get_feedback_count(self):
+        """Number of feedback entries"""
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+
+    def get_feedback_for_item(self, item_id):
+        """Get feedback specific to a menu item"""
+        return self._query_feedback("WHERE f.item_id = ?", (item_id,))
+
+    def _query_feedback(self, where, params):
+        """Rebuild feedback entries into a FeedbackTable, like the JSON engine returns"""
+        try:
+            feedback = FeedbackTable()
+            with closing(self._connect()) as conn:
+                cursor = conn.execute(
+                    "SELECT f.id, f.item_id, f.item_name, f.timestamp, "
+                    "r.component_id, r.rating "
+                    "FROM feedback f LEFT JOIN feedback_ratings r ON r.feedback_id = f.id "
+                    f"{where} ORDER BY f.id",
+                    params
+                )
+                # Rows go straight into the table's columns, one entry per feedback ID
+                current_id = None
+                for row in cursor:
+                    if row["id"] != current_id:
+                        current_id = row["id"]
+                        feedback.add_entry(datetime.strptime(row["timestamp"], TIMESTAMP_FORMAT),
+                                           row["item_id"], row["item_name"])
+                    if row["component_id"] is not None:
+                        feedback.add_rating(row["component_id"], row["rating"])
+            return feedback
+        except Exception as e:
+            print(f"Error loading feedback data: {e}")
+            return FeedbackTable()
+
+    def _build_feedback_record(self, row):
+        """FeedbackRecord for a feedback row; its ratings are added by the caller"""
+        return FeedbackRecord(row["item_id"], row["item_name"], {},
+                              datetime.strptime(row["timestamp"], TIMESTAMP_FORMAT))
+
+    def get_rating_columns(self):
+        """Get every rating as parallel NumPy columns, one row per component rating"""
+        import numpy as np
+
+        try:
+            with closing(self._connect()) as conn:
+                rows = conn.execute(
+                    "SELECT f.id, CAST(strftime('%s', f.timestamp) AS INTEGER), "
+                    "f.item_id, r.component_id, r.rating "
+                    "FROM feedback f JOIN feedback_ratings r ON r.feedback_id = f.id "
+                    "ORDER BY f.id"
+                ).fetchall()
+
+            names = ("feedback_id", "timestamp", "item_id", "component_id", "rating")
+            dtypes = ("int32", "int64", "int32", "int32", "int8")
+            values = list(zip(*rows)) if rows else [()] * len(names)
+            return {name: np.array(column, dtype=dtype)
+                    for name, column, dtype in zip(names, values, dtypes)}
+        except Exception as e:
+            print(f"Error loading feedback columns: {e}")
+            return None
+
+    def get_rating_aggregates(self):
+        """Get running rating statistics per component and per (component, item)"""
+        try:
+            with closing(self._connect()) as conn:
+                rows = conn.execute("SELECT * FROM rating_stats").fetchall()
+
+            aggregates = {"components": {}, "items": {}}
+            for row in rows:
+                stats = {
+                    "count": row["count"],
+                    "sum": row["total"],
+                    "sum_sq": row["total_sq"],
+                    "min": row["min_rating"],
+                    "max": row["max_rating"],
+                    "histogram": [row["h1"], row["h2"], row["h3"], row["h4"], row["h5"]]
+                }
+                aggregates["items"].setdefault(row["component_id"], {})[row["item_id"]] = stats
+                merge_stats(aggregates["components"].setdefault(row["component_id"], new_stats()),
+                            stats)
+            return aggregates
+        except Exception as e:
+            print(f"Error loading rating aggregates: {e}")
+            return {"components": {}, "items": {}}
+
+if __name__ == "__main__":
+    # Re-import menu.json (and the feedback log, if the database has none yet)
+    if not os.path.exists("data"):
+        os.makedirs("data")
+    db_file = "data/cafeteria.db"
+    is_new = not os.path.exists(db_file)
+    db = SQLiteDatabase(db_file)
+    if not is_new:
+        db.import_from_json()
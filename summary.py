@@ -0,0 +1,109 @@
+import numpy as np
+from rating_aggregates import MAX_RATING, MIN_RATING
+
+# Percentiles reported besides the median, and the z-score of the
+# confidence interval for the mean rating (95%)
+PERCENTILES = (25, 75, 90)
+CI_Z = 1.96
+
+# One histogram bucket per rating value
+BUCKETS = MAX_RATING - MIN_RATING + 1
+
+def summarize_histograms(histograms):
+    """Rating statistics for every row of a histogram matrix.
+
+    Ratings are whole numbers, so every statistic follows exactly from how
+    many ratings of each value there are; each one is computed for all rows
+    at once. Returns a dict of arrays: count, sum, mean, median, std
+    (ddof=1), min, max, p<q> for each of PERCENTILES, ci_low and ci_high.
+    Statistics of rows without ratings are NaN.
+    """
+    histograms = np.asarray(histograms, dtype=np.int64).reshape(-1, BUCKETS)
+    ratings = np.arange(MIN_RATING, MAX_RATING + 1, dtype=np.float64)
+    count = histograms.sum(axis=1)
+    rated = count > 0
+    total = histograms @ ratings
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        variance = (histograms @ (ratings * ratings) - total * mean) / (count - 1)
+    std = np.sqrt(np.maximum(variance, 0.0))
+    std[count < 2] = np.nan
+
+    # Value of the k-th smallest rating (0-based) of every row
+    cumulative = histograms.cumsum(axis=1)
+    def value_at(position):
+        index = (cumulative <= position[:, None]).sum(axis=1)
+        return np.where(rated, ratings[np.minimum(index, BUCKETS - 1)], np.nan)
+
+    def percentile(q):
+        # Linear interpolation between ratings, like numpy.percentile
+        position = np.maximum(q / 100 * (count - 1), 0)
+        lower = np.floor(position)
+        lower_value = value_at(lower)
+        upper_value = value_at(np.minimum(lower + 1, np.maximum(count - 1, 0)))
+        return lower_value + (upper_value - lower_value) * (position - lower)
+
+    stats = {
+        "count": count,
+        "sum": total,
+        "mean": mean,
+        "median": percentile(50),
+        "std": std,
+        "min": value_at(np.zeros(len(count))),
+        "max": value_at(np.maximum(count - 1, 0).astype(np.float64)),
+    }
+    for q in PERCENTILES:
+        stats[f"p{q}"] = percentile(q)
+
+    # Normal-approximation confidence interval for the mean
+    with np.errstate(invalid='ignore', divide='ignore'):
+        margin = CI_Z * std / np.sqrt(count)
+    stats["ci_low"] = mean - margin
+    stats["ci_high"] = mean + margin
+    return stats
+
+def rating_histograms(values):
+    """Histogram of every column of a rating matrix (NaN where not rated)"""
+    values = np.asarray(values)
+    rows, cols = np.nonzero(~np.isnan(values))
+    ratings = values[rows, cols].astype(np.int64) - MIN_RATING
+
+    # Ratings outside the scale are not counted, as in RatingAggregates
+    valid = (ratings >= 0) & (ratings < BUCKETS)
+    cells = cols[valid] * BUCKETS + ratings[valid]
+    return np.bincount(cells, minlength=values.shape[1] * BUCKETS).reshape(values.shape[1], BUCKETS)
+
+def component_summary(aggregates):
+    """Statistics per component from Database.get_rating_aggregates.
+
+    Returns the component IDs, in order, and summarize_histograms' dict.
+    """
+    components = aggregates["components"]
+    comp_ids = sorted(components, key=int)
+    histograms = [components[comp_id]["histogram"] for comp_id in comp_ids]
+    return comp_ids, summarize_histograms(histograms)
+
+def item_component_summary(aggregates):
+    """Statistics per (item, component) pair from Database.get_rating_aggregates.
+
+    Returns the (item_id, comp_id) pairs, in order, and summarize_histograms' dict.
+    """
+    items = aggregates["items"]
+    keys = [(item_id, comp_id)
+            for comp_id in sorted(items, key=int)
+            for item_id in sorted(items[comp_id], key=int)]
+    histograms = [items[comp_id][item_id]["histogram"] for item_id, comp_id in keys]
+    return keys, summarize_histograms(histograms)
+
+def item_component_averages(aggregates):
+    """Rating count and average per component, grouped by menu item"""
+    keys, stats = item_component_summary(aggregates)
+    averages = {}
+    for (item_id, comp_id), count, mean in zip(keys, stats["count"], stats["mean"]):
+        if count:
+            averages.setdefault(item_id, {})[comp_id] = {
+                "count": int(count),
+                "average": float(mean)
+            }
+    return averages